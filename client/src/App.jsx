@@ -16,6 +16,7 @@ function App() {
   const [terminalSession, setTerminalSession] = useState(null); // { repoName, sessionId, websocketPath }
   const [sessionEndTimeEpoch, setSessionEndTimeEpoch] = useState(null); // NEW: Store timer end time (Unix timestamp in seconds)
   const [isExtendingTimer, setIsExtendingTimer] = useState(false); // NEW: State for extend button
+  const [isTimerPaused, setIsTimerPaused] = useState(false); // True while the backend has the session suspended
 
   // MODIFIED: handleStartScenario now accepts initialEndTimeEpoch
   const handleStartScenario = useCallback((repoName, sessionId, websocketPath, initialEndTimeEpoch) => {
@@ -30,8 +31,21 @@ function App() {
     }
     setTerminalSession(null);
     setSessionEndTimeEpoch(null); // NEW: Clear end time when terminal closes
+    setIsTimerPaused(false);
   }, [terminalSession]); // Depends on terminalSession
 
+  // The backend resumed the timer (session resumed after an idle suspend)
+  const handleTimerUpdate = useCallback((endTimeEpoch) => {
+    setSessionEndTimeEpoch(endTimeEpoch);
+    setIsTimerPaused(false);
+  }, []);
+
+  // The backend paused the timer (idle suspend): keep showing the remaining time without counting down
+  const handleTimerPaused = useCallback((remainingSeconds) => {
+    setSessionEndTimeEpoch(Date.now() / 1000 + remainingSeconds);
+    setIsTimerPaused(true);
+  }, []);
+
   // NEW: Function to handle extending the timer
   const handleExtendTimer = async () => {
     if (!terminalSession || !terminalSession.sessionId) {
@@ -79,7 +93,7 @@ function App() {
 
             {/* NEW: Timer Display and Extend Button */}
             <div style={{ margin: '10px 0', display: 'flex', alignItems: 'center', justifyContent: 'center', gap: '20px' }}>
-              {sessionEndTimeEpoch !== null && <TimerDisplay endTimeEpoch={sessionEndTimeEpoch} />}
+              {sessionEndTimeEpoch !== null && <TimerDisplay endTimeEpoch={sessionEndTimeEpoch} isPaused={isTimerPaused} />}
               <button 
                 onClick={handleExtendTimer}
                 disabled={isExtendingTimer || sessionEndTimeEpoch === null} // Disable if no timer or already extending
@@ -105,6 +119,8 @@ function App() {
               onCloseTerminal={handleCloseTerminalAndCleanup}
               isMaximized={false} 
               isFullscreen={false}
+              onTimerUpdate={handleTimerUpdate}
+              onTimerPaused={handleTimerPaused}
             />
             <button 
               onClick={handleCloseTerminalAndCleanup} 
@@ -1,5 +1,5 @@
 // --- START client/src/components/ScenarioCard.jsx ---
-import React, { useState, useCallback } from 'react';
+import React, { useState, useCallback, useEffect, useRef } from 'react';
 import PropTypes from 'prop-types';
 import { FontAwesomeIcon } from '@fortawesome/react-fontawesome';
 import './ScenarioCard.module.css'; // Or your relevant CSS import
@@ -14,9 +14,54 @@ const SCENARIO_SPECIFIC_GUIDE_URLS = {
   "TA-Tool": "https://www.notion.so/wekaio/TA-Tool-Testing-1fa30b0d101c80d88063e6518b63d173"
 };
 
+// Asks the backend to stop an in-flight provisioning run. sendBeacon still goes out while the page is unloading.
+function sendCancelBeacon(clientRequestId) {
+  const cancelUrl = `${API_BASE_URL}/api/scenarios/${encodeURIComponent(clientRequestId)}/cancel`;
+  if (!navigator.sendBeacon || !navigator.sendBeacon(cancelUrl)) {
+    fetch(cancelUrl, { method: 'POST', keepalive: true }).catch(() => {});
+  }
+}
+
+// crypto.randomUUID() only exists in secure contexts (HTTPS/localhost); the app is also served over plain HTTP
+function newClientRequestId() {
+  if (window.crypto && typeof window.crypto.randomUUID === 'function') {
+    return window.crypto.randomUUID();
+  }
+  if (window.crypto && typeof window.crypto.getRandomValues === 'function') {
+    return Array.from(window.crypto.getRandomValues(new Uint8Array(16)), (b) => b.toString(16).padStart(2, '0')).join('');
+  }
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
 function ScenarioCard({ label, repo, onStartScenario }) {
   const [loading, setLoading] = useState(false);
+  const [cancelling, setCancelling] = useState(false); // Cancel sent, waiting for POST /api/scenarios to return
   const [error, setError] = useState(null);
+  // Set while POST /api/scenarios is running; identifies the run for the cancel endpoint before a sessionId exists
+  const clientRequestIdRef = useRef(null);
+
+  useEffect(() => {
+    // Leaving the page (or unmounting the card) mid-provisioning cancels the run so its resources are released
+    const cancelPending = () => {
+      if (clientRequestIdRef.current) {
+        sendCancelBeacon(clientRequestIdRef.current);
+        clientRequestIdRef.current = null;
+      }
+    };
+    window.addEventListener('pagehide', cancelPending);
+    return () => {
+      window.removeEventListener('pagehide', cancelPending);
+      cancelPending();
+    };
+  }, []);
+
+  const handleCancelClick = useCallback(() => {
+    if (clientRequestIdRef.current) {
+      console.log(`Cancelling scenario provisioning: ${repo}`);
+      setCancelling(true);
+      sendCancelBeacon(clientRequestIdRef.current);
+    }
+  }, [repo]);
 
   const handleStartClick = useCallback(async () => {
     setLoading(true);
@@ -28,15 +73,23 @@ function ScenarioCard({ label, repo, onStartScenario }) {
     console.log(`Opened guide: ${guideUrl}`);
 
     try {
+      const clientRequestId = newClientRequestId();
+      clientRequestIdRef.current = clientRequestId;
+
       const response = await fetch(`${API_BASE_URL}/api/scenarios`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ repo }),
+        body: JSON.stringify({ repo, clientRequestId }),
       });
 
       console.log(`Response status from /api/scenarios: ${response.status}`);
       const responseData = await response.json();
 
+      if (responseData.cancelled) {
+        console.log(`Scenario provisioning cancelled: ${repo}`);
+        return;
+      }
+
       if (!response.ok) {
         const errorMessage = responseData.error || responseData.message || `HTTP error! Status: ${response.status}`;
         console.error("Failed to start scenario (response not ok):", errorMessage, responseData);
@@ -56,6 +109,8 @@ function ScenarioCard({ label, repo, onStartScenario }) {
       console.error("Error in handleStartClick:", err);
       setError(err.message || "An unknown error occurred.");
     } finally {
+      clientRequestIdRef.current = null;
+      setCancelling(false);
       setLoading(false);
     }
   }, [repo, onStartScenario]);
@@ -66,7 +121,10 @@ function ScenarioCard({ label, repo, onStartScenario }) {
       {loading ? (
         <div className="weka-scenario-card-loading">
           <FontAwesomeIcon icon="fa-solid fa-circle-notch" spin size="2x" />
-          <p>Preparing scenario...May take 2-5 minutes</p>
+          <p>{cancelling ? 'Cancelling…' : 'Preparing scenario...May take 2-5 minutes'}</p>
+          <button className="weka-scenario-card-button" onClick={handleCancelClick} disabled={cancelling}>
+            {cancelling ? 'Cancelling…' : 'Cancel'}
+          </button>
         </div>
       ) : (
         <button className="weka-scenario-card-button" onClick={handleStartClick}>
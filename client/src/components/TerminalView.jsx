@@ -13,13 +13,15 @@ const API_BASE_URL = import.meta.env.VITE_APP_BASE_URL || 'http://localhost:5000
 const MAXIMIZED_CLASS = 'terminal-instance-maximized';
 const FULLSCREEN_CLASS = 'terminal-instance-fullscreen';
 
-function TerminalView({ sessionId, websocketPath, onCloseTerminal, isMaximized, isFullscreen }) {
+function TerminalView({ sessionId, websocketPath, onCloseTerminal, isMaximized, isFullscreen, role = 'participant', instructorToken, onTimerUpdate, onTimerPaused }) {
+  const isSpectator = role === 'spectator'; // Spectators receive output only; the server rejects their input/resize
   const termContainerRef = useRef(null);
   const xtermInstanceRef = useRef(null);
   const socketRef = useRef(null);
   const fitAddonRef = useRef(null);
 
   const sendResizeToBackend = useCallback(() => {
+    if (isSpectator) return;
     if (socketRef.current && socketRef.current.connected && xtermInstanceRef.current && fitAddonRef.current) {
       try {
         fitAddonRef.current.fit(); 
@@ -34,7 +36,7 @@ function TerminalView({ sessionId, websocketPath, onCloseTerminal, isMaximized,
         console.error(`[TerminalView ${sessionId}] Error during backend resize notification:`, e);
       }
     }
-  }, [sessionId]);
+  }, [sessionId, isSpectator]);
 
   const handleResizeAndNotify = useCallback(() => {
     if (xtermInstanceRef.current && fitAddonRef.current) {
@@ -58,7 +60,8 @@ function TerminalView({ sessionId, websocketPath, onCloseTerminal, isMaximized,
       console.log(`[TerminalView ${sessionId}] Initializing... Path: ${websocketPath}`);
 
       term = new Terminal({
-        cursorBlink: true,
+        cursorBlink: !isSpectator,
+        disableStdin: isSpectator,
         convertEol: true,
         rows: 24,
         cols: 80,
@@ -105,7 +108,7 @@ function TerminalView({ sessionId, websocketPath, onCloseTerminal, isMaximized,
       socket.on('connect', () => {
         term.writeln('\r\n\x1b[32mSocket.IO: Connected to backend session.\x1b[0m');
         console.log(`[TerminalView ${sessionId}] Socket.IO Connected. SID: ${socket.id}. Emitting 'join_scenario'.`);
-        socket.emit('join_scenario', { sessionId: sessionId });
+        socket.emit('join_scenario', { sessionId: sessionId, role: role, instructorToken: isSpectator ? instructorToken : undefined });
         setTimeout(handleResizeAndNotify, 150);
       });
 
@@ -115,6 +118,20 @@ function TerminalView({ sessionId, websocketPath, onCloseTerminal, isMaximized,
         }
       });
       
+      // Sent when a suspended session is resumed: its timer was paused while the instances were stopped
+      socket.on('timer-update', (data) => {
+        if (data && typeof data.endTime === 'number' && onTimerUpdate) {
+          onTimerUpdate(data.endTime);
+        }
+      });
+      
+      // Sent when the idle monitor suspends the session: its timer stops until the session is resumed
+      socket.on('timer-paused', (data) => {
+        if (data && typeof data.remainingSeconds === 'number' && onTimerPaused) {
+          onTimerPaused(data.remainingSeconds);
+        }
+      });
+      
       socket.on('disconnect', (reason) => {
         const msg = `\r\n\x1b[31mSocket.IO Disconnected: ${reason}. SID was: ${socket?.id || 'N/A'}\x1b[0m`;
         if (term && term.element) term.writeln(msg);
@@ -128,6 +145,7 @@ function TerminalView({ sessionId, websocketPath, onCloseTerminal, isMaximized,
       });
 
       term.onData((data) => {
+        if (isSpectator) return;
         if (socketRef.current && socketRef.current.connected) {
           const payload = { input: data, sessionId: sessionId };
           socketRef.current.emit('terminalInput', payload, (ack) => {
@@ -166,7 +184,7 @@ function TerminalView({ sessionId, websocketPath, onCloseTerminal, isMaximized,
       }
       // No need to dispose webLinksAddonInstance explicitly if it's just loaded
     };
-  }, [sessionId, websocketPath, onCloseTerminal, handleResizeAndNotify]); 
+  }, [sessionId, websocketPath, onCloseTerminal, handleResizeAndNotify, role, isSpectator, instructorToken, onTimerUpdate, onTimerPaused]); 
 
   useEffect(() => {
     const container = termContainerRef.current;
@@ -198,6 +216,14 @@ TerminalView.propTypes = {
   onCloseTerminal: PropTypes.func.isRequired,
   isMaximized: PropTypes.bool.isRequired,
   isFullscreen: PropTypes.bool.isRequired,
+  // 'spectator' joins read-only (e.g. an instructor watching a student); defaults to 'participant'.
+  role: PropTypes.oneOf(['participant', 'spectator']),
+  // Required by the server for role 'spectator' (its INSTRUCTOR_TOKEN).
+  instructorToken: PropTypes.string,
+  // Called with the new end time (Unix seconds) when the backend adjusts the session timer.
+  onTimerUpdate: PropTypes.func,
+  // Called with the remaining seconds when the backend pauses the session timer (idle suspend).
+  onTimerPaused: PropTypes.func,
   // onToggleMaximize and onToggleFullscreen are not directly called by TerminalView, but App.jsx passes them.
   // It's fine to keep them in propTypes if App.jsx is providing them.
 };
@@ -9,7 +9,7 @@ function formatTime(totalSeconds) {
   return `${String(minutes).padStart(2, '0')}:${String(seconds).padStart(2, '0')}`;
 }
 
-function TimerDisplay({ endTimeEpoch }) { // endTimeEpoch is a Unix timestamp in seconds
+function TimerDisplay({ endTimeEpoch, isPaused = false }) { // endTimeEpoch is a Unix timestamp in seconds
   const [remainingSeconds, setRemainingSeconds] = useState(0);
   const [isExpired, setIsExpired] = useState(false);
 
@@ -38,11 +38,12 @@ function TimerDisplay({ endTimeEpoch }) { // endTimeEpoch is a Unix timestamp in
     };
 
     calculateRemaining(); // Initial calculation
+    if (isPaused) return; // Suspended session: the remaining time stays frozen until the backend resumes the timer
     intervalId = setInterval(calculateRemaining, 1000); // Update every second
 
-    // Cleanup function: clear the interval when the component unmounts or endTimeEpoch changes.
+    // Cleanup function: clear the interval when the component unmounts or endTimeEpoch/isPaused changes.
     return () => clearInterval(intervalId);
-  }, [endTimeEpoch]); // Dependency array: re-run effect if endTimeEpoch changes
+  }, [endTimeEpoch, isPaused]); // Dependency array: re-run effect if endTimeEpoch or isPaused changes
 
   const timerText = useMemo(() => {
     if (endTimeEpoch === null || typeof endTimeEpoch === 'undefined') {
@@ -51,8 +52,8 @@ function TimerDisplay({ endTimeEpoch }) { // endTimeEpoch is a Unix timestamp in
     if (isExpired) {
       return "Time Remaining: EXPIRED";
     }
-    return `Time Remaining: ${formatTime(remainingSeconds)}`;
-  }, [endTimeEpoch, isExpired, remainingSeconds]);
+    return `Time Remaining: ${formatTime(remainingSeconds)}${isPaused ? ' (paused)' : ''}`;
+  }, [endTimeEpoch, isExpired, isPaused, remainingSeconds]);
 
   const timerColor = useMemo(() => {
     if (endTimeEpoch === null || typeof endTimeEpoch === 'undefined' || isExpired) {
@@ -74,6 +75,8 @@ function TimerDisplay({ endTimeEpoch }) { // endTimeEpoch is a Unix timestamp in
 TimerDisplay.propTypes = {
   // Unix timestamp in seconds, can be null or undefined if no timer is active.
   endTimeEpoch: PropTypes.number, 
+  // True while the session is suspended: endTimeEpoch - now is shown without counting down.
+  isPaused: PropTypes.bool,
 };
 
 export default React.memo(TimerDisplay); // Memoize for performance as it updates frequently
@@ -1,7 +1,6 @@
 from flask import Flask
 from flask_socketio import SocketIO
 from config import Config
-import logging # For debugging
 from flask_cors import CORS
 
 # Initialize SocketIO but don't attach to app yet
@@ -10,7 +9,7 @@ socketio = SocketIO()
 def create_app(config_class=Config):
     app = Flask(__name__, template_folder="../") # Assuming client is served separately
     app.config.from_object(config_class)
-    app.logger.setLevel(logging.DEBUG) # Ensure app logger is set to debug
+    app.logger.setLevel(app.config['LOG_LEVEL'])
     CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
 
     # Initialize Flask-SocketIO with the app
@@ -25,6 +24,11 @@ def create_app(config_class=Config):
     # to avoid circular imports and ensure context is available.
     with app.app_context():
         from app.api import terminal_events # noqa
+    terminal_events.start_idle_monitor(app)
+
+    if app.config.get('SEED_SESSIONS_FILE'):
+        from app.lifecycle import load_seed_sessions
+        load_seed_sessions(app.config['SEED_SESSIONS_FILE'], app.logger)
 
     @app.route('/')
     def index():
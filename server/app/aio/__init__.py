@@ -0,0 +1,52 @@
+# --- START server/app/aio/__init__.py ---
+# asyncio server mode: aiohttp + python-socketio AsyncServer + asyncssh, no eventlet monkey-patching.
+# Serves the same /api/scenarios routes and /terminal_ws events as the Flask/eventlet app,
+# so the client works unchanged. Start it with `python main_aio.py`.
+import logging
+import socketio as python_socketio
+from aiohttp import web
+from config import Config
+
+sio = python_socketio.AsyncServer(async_mode='aiohttp', cors_allowed_origins='*')
+logger = logging.getLogger('app.aio')
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+    'Access-Control-Allow-Methods': 'GET,PUT,POST,DELETE,OPTIONS',
+    'Access-Control-Allow-Credentials': 'true',
+}
+
+@web.middleware
+async def cors_middleware(request, handler):
+    # Same CORS behaviour as the Flask app for /api/*; /socket.io handles its own CORS
+    if not request.path.startswith('/api/'):
+        return await handler(request)
+    if request.method == 'OPTIONS':
+        response = web.Response(status=200)
+    else:
+        response = await handler(request)
+    response.headers.update(CORS_HEADERS)
+    return response
+
+async def index(request):
+    return web.Response(text="aiohttp app is running! Use /api/scenarios for API endpoints and /socket.io for WebSockets.")
+
+def create_aio_app(config_class=Config):
+    app = web.Application(middlewares=[cors_middleware])
+    app['config'] = config_class
+    sio.attach(app)
+
+    from app.aio import scenarios, terminal_events
+    scenarios.register_routes(app)
+    sio.register_namespace(terminal_events.TerminalNamespace('/terminal_ws', config_class))
+    app.on_startup.append(terminal_events.start_idle_monitor)
+    app.router.add_get('/', index)
+
+    if getattr(config_class, 'SEED_SESSIONS_FILE', None):
+        from app.lifecycle import load_seed_sessions
+        load_seed_sessions(config_class.SEED_SESSIONS_FILE, logger)
+
+    logger.info("aiohttp App created with async SocketIO.")
+    return app
+# --- END server/app/aio/__init__.py ---
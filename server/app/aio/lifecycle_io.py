@@ -0,0 +1,58 @@
+# --- START server/app/aio/lifecycle_io.py ---
+import asyncio
+import concurrent.futures
+from app.aio import sio
+from app.lifecycle import NAMESPACE, ServerIO
+from app.fanout import broadcast_pty_output_async
+
+# app/lifecycle.py's ServerIO for the asyncio server. The lifecycle functions block (terraform, boto3, SSH polling),
+# so this mode runs them with asyncio.to_thread; from that worker thread, emits are handed back to the event loop.
+
+BACKGROUND_TASKS = set()  # Strong references to fire-and-forget tasks so they aren't garbage collected
+
+
+def spawn_in_thread(func, *args):
+    """Runs func(*args) in a worker thread as a background task. Must be called on the event loop."""
+    task = asyncio.create_task(asyncio.to_thread(func, *args))
+    BACKGROUND_TASKS.add(task)
+    task.add_done_callback(BACKGROUND_TASKS.discard)
+    return task
+
+
+def on_loop(func):
+    """Wraps a function that must run on the event loop (e.g. closing asyncssh objects) so worker threads can call it."""
+    loop = asyncio.get_running_loop()
+
+    def call_on_loop(*args):
+        future = concurrent.futures.Future()
+
+        def run():
+            try:
+                future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+        loop.call_soon_threadsafe(run)
+        return future.result()
+    return call_on_loop
+
+
+def server_io():
+    """ServerIO for lifecycle functions running in a worker thread. Must be created on the event loop."""
+    loop = asyncio.get_running_loop()
+
+    def run_on_loop(coro):
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    def spawn(func, *args):
+        try:
+            loop.call_soon_threadsafe(spawn_in_thread, func, *args)
+        except RuntimeError:
+            func(*args)  # The loop is closed (server shutting down): finish the work in this thread
+
+    return ServerIO(
+        emit=lambda event, data, to: run_on_loop(sio.emit(event, data, to=to, namespace=NAMESPACE)),
+        broadcast=lambda session_id, output: run_on_loop(broadcast_pty_output_async(sio, session_id, output, namespace=NAMESPACE)),
+        close_room=lambda room: run_on_loop(sio.close_room(room, namespace=NAMESPACE)),
+        spawn=spawn,
+    )
+# --- END server/app/aio/lifecycle_io.py ---
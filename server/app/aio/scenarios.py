@@ -0,0 +1,64 @@
+# --- START server/app/aio/scenarios.py ---
+import json
+import asyncio
+import threading
+from aiohttp import web
+from app.aio import logger
+from app.aio.lifecycle_io import server_io
+from app.lifecycle import provision_scenario, cancel_provisioning, extend_scenario_timer, is_instructor
+from app.logging_setup import read_session_log
+
+# aiohttp routes for /api/scenarios; the scenario lifecycle itself is in app/lifecycle.py
+
+
+def _client_disconnect_probe(request, handler_cancelled):
+    # aiohttp keeps running the handler after the client disconnects; the transport shows whether it is still there.
+    # The handler itself can be cancelled too (server shutdown), which the worker thread only sees through the event.
+    return lambda: handler_cancelled.is_set() or request.transport is None or request.transport.is_closing()
+
+async def create_scenario(request):
+    try:
+        data = await request.json()
+    except json.JSONDecodeError:
+        data = None
+    config = request.app['config']
+    handler_cancelled = threading.Event()
+    provision = asyncio.to_thread(
+        provision_scenario, data, config.SCENARIO_PLACEMENTS, config.SCENARIO_PLACEMENT_QUOTAS, server_io(), logger,
+        _client_disconnect_probe(request, handler_cancelled)
+    )
+    try:
+        body, status = await provision
+    except asyncio.CancelledError:
+        handler_cancelled.set()  # Terraform gets SIGINT at its next cancel check instead of running on unattended
+        raise
+    return web.json_response(body, status=status)
+
+async def cancel_scenario_route(request):
+    body, status = cancel_provisioning(request.match_info['session_or_request_id'], logger)
+    return web.json_response(body, status=status)
+
+async def extend_scenario_timer_route(request):
+    body, status = extend_scenario_timer(request.match_info['session_id'], logger)
+    return web.json_response(body, status=status)
+
+async def get_scenario_logs(request):
+    # Instructors only, and checked before the lookup so the answer doesn't reveal which sessions exist
+    if not is_instructor(request.headers.get('X-Instructor-Token'), request.app['config'].INSTRUCTOR_TOKEN):
+        return web.json_response({'error': 'Instructor token required'}, status=403)
+    session_id = request.match_info['session_id']
+    tail_lines = request.query.get('tail')
+    log_content = await asyncio.to_thread(
+        read_session_log,
+        request.app['config'].SESSION_LOG_DIR, session_id, int(tail_lines) if tail_lines and tail_lines.isdigit() else None
+    )
+    if log_content is None:
+        return web.json_response({'error': 'No log found for this session'}, status=404)
+    return web.Response(text=log_content, content_type='application/x-ndjson')
+
+def register_routes(app):
+    app.router.add_post('/api/scenarios', create_scenario)
+    app.router.add_post('/api/scenarios/{session_id}/extend_timer', extend_scenario_timer_route)
+    app.router.add_post('/api/scenarios/{session_or_request_id}/cancel', cancel_scenario_route)
+    app.router.add_get('/api/scenarios/{session_id}/logs', get_scenario_logs)
+# --- END server/app/aio/scenarios.py ---
@@ -0,0 +1,266 @@
+# --- START server/app/aio/terminal_events.py ---
+import asyncio
+import traceback
+import asyncssh
+import socketio as python_socketio
+from app.aio import sio, logger
+from app.aio.lifecycle_io import server_io, spawn_in_thread, on_loop
+from app.lifecycle import (
+    SCENARIO_SESSIONS, cleanup_session, suspend_session, resume_session, suspend_idle_sessions,
+    check_join, last_client_gone_action, input_while_suspended_action, watch_sessions, unwatch_sessions
+)
+from app.fanout import ROLE_PARTICIPANT, ROLE_SPECTATOR, subscribe, unsubscribe_all, get_role, broadcast_pty_output_async
+from app.logging_setup import RATE_LIMITED, session_logger, log_session_detail
+from app.idle_manager import record_input, record_output, IDLE_CHECK_INTERVAL_SECONDS
+
+PTY_SESSIONS = {} # Stores scenario_id: {"clients": set(), "ssh_conn", "ssh_process", "reader_task", "connect_lock"}
+
+async def ssh_output_reader(scenario_id, process):
+    log = session_logger(logger, scenario_id, 'ssh') # Tags records with session_id/phase
+    log.info(f"[SSH Reader {scenario_id}]: Starting PTY output reader.")
+    try:
+        while True:
+            # Awaiting the channel replaces the select()/sleep polling loop of the eventlet mode
+            output = await process.stdout.read(4096)
+            if not output:
+                break
+            record_output(scenario_id)
+            await broadcast_pty_output_async(sio, scenario_id, output)
+    except asyncio.CancelledError:
+        raise
+    except asyncssh.Error as e:
+        log.error(f"[SSH Reader {scenario_id}]: SSH error in PTY reader: {e}")
+        await broadcast_pty_output_async(sio, scenario_id, f"\r\n[SSH Connection Error in reader: {e}]\r\n")
+    except Exception as e:
+        log.error(f"[SSH Reader {scenario_id}]: Unhandled exception in PTY reader: {e}", exc_info=True)
+        await broadcast_pty_output_async(sio, scenario_id, f"\r\n[Error reading from remote: {e}]\r\n")
+    finally:
+        log.info(f"[SSH Reader {scenario_id}]: PTY output reader stopped.")
+        if scenario_id in PTY_SESSIONS and PTY_SESSIONS[scenario_id].get("ssh_process") is process:
+            PTY_SESSIONS[scenario_id]["ssh_process"] = None
+            await broadcast_pty_output_async(sio, scenario_id, '\r\n[Terminal session may have ended or encountered an issue.]\r\n$ ')
+
+def _close_ssh_connection(scenario_id, log=None):
+    # Closes SSH but keeps the PTY_SESSIONS entry (and its clients) so a later join or keystroke can reconnect
+    session_pty_data = PTY_SESSIONS.get(scenario_id)
+    if not session_pty_data:
+        return
+    ssh_process = session_pty_data.get("ssh_process")
+    session_pty_data["ssh_process"] = None # Set first so the reader doesn't report a broken session
+    reader_task = session_pty_data.pop("reader_task", None)
+    if reader_task:
+        reader_task.cancel()
+    if ssh_process:
+        ssh_process.close()
+    ssh_conn = session_pty_data.pop("ssh_conn", None)
+    if ssh_conn:
+        ssh_conn.close()
+
+def _close_pty(scenario_id, log):
+    # Full PTY teardown for cleanup_session: drops the PTY_SESSIONS entry as well
+    _close_ssh_connection(scenario_id, log)
+    PTY_SESSIONS.pop(scenario_id, None)
+
+# The lifecycle functions block, so they run in a worker thread; the SSH/PTY closers they call back into use
+# asyncssh objects and tasks, which only the event loop may touch (on_loop).
+
+async def cleanup_scenario_session(scenario_id):
+    await asyncio.to_thread(cleanup_session, scenario_id, on_loop(_close_pty), server_io(), logger)
+
+async def suspend_scenario_session(config, scenario_id):
+    """Stops an idle session's instances, closing SSH and pausing its timer. Returns True if suspended."""
+    return await asyncio.to_thread(
+        suspend_session, scenario_id, config.EC2_ENDPOINT_URL, on_loop(_close_ssh_connection), server_io(), logger
+    )
+
+async def resume_scenario_session(config, scenario_id, client_sid):
+    """Starts a suspended session's instances again. Returns True when the session is ready for SSH."""
+    return await asyncio.to_thread(resume_session, scenario_id, client_sid, config.EC2_ENDPOINT_URL, server_io(), logger)
+
+async def idle_monitor(config):
+    if not config.IDLE_SUSPEND_SECONDS:
+        logger.info("Idle: Idle suspend disabled (IDLE_SUSPEND_SECONDS=0).")
+        return
+    logger.info(f"Idle: Monitor started, suspending sessions idle for {config.IDLE_SUSPEND_SECONDS}s.")
+    while True:
+        await asyncio.sleep(IDLE_CHECK_INTERVAL_SECONDS)
+        await asyncio.to_thread(
+            suspend_idle_sessions, config.IDLE_SUSPEND_SECONDS, config.EC2_ENDPOINT_URL,
+            on_loop(_close_ssh_connection), server_io(), logger
+        )
+
+async def start_idle_monitor(app):
+    app['idle_monitor'] = asyncio.create_task(idle_monitor(app['config']))
+
+
+class TerminalNamespace(python_socketio.AsyncNamespace):
+    def __init__(self, namespace, config):
+        super().__init__(namespace)
+        self.config = config
+
+    async def on_connect(self, sid, environ):
+        logger.info(f"SocketIO: Client SID {sid} connected to namespace {self.namespace}.")
+        await self.emit('pty-output', {"output": f"Socket.IO Connected (SID: {sid}). Send 'join_scenario' with your scenario's sessionId.\r\n"}, to=sid)
+
+    async def on_join_scenario(self, sid, data):
+        scenario_session_id = data.get('sessionId')
+        role = data.get('role', ROLE_PARTICIPANT)
+        logger.info(f"SocketIO: Client {sid} attempting to join scenario: {scenario_session_id} as {role}")
+
+        error_message, disconnect_client = check_join(
+            scenario_session_id, role, data.get('instructorToken'), self.config.INSTRUCTOR_TOKEN
+        )
+        if error_message:
+            logger.error(f"SocketIO: Client {sid} - Rejected join of {scenario_session_id} as {role}: {error_message.strip()}")
+            await self.emit('pty-output', {"output": error_message}, to=sid)
+            if disconnect_client:
+                await self.disconnect(sid)
+            return
+        log = session_logger(logger, scenario_session_id, 'ssh') # Tags records with session_id/phase (known sessions only)
+
+        if role == ROLE_SPECTATOR:
+            subscribe(scenario_session_id, sid, ROLE_SPECTATOR)
+            await self.enter_room(sid, scenario_session_id) # Output goes to the session's room
+            status = "live" if PTY_SESSIONS.get(scenario_session_id, {}).get("ssh_process") else "waiting for the participant to connect"
+            log.info(f"SocketIO: Client SID {sid} spectating scenario {scenario_session_id} ({status})")
+            await self.emit('pty-output', {"output": f"\r\nSpectating '{SCENARIO_SESSIONS[scenario_session_id]['repo']}' (read-only, {status}).\r\n"}, to=sid)
+            return
+
+        await self.enter_room(sid, scenario_session_id)
+        subscribe(scenario_session_id, sid, ROLE_PARTICIPANT)
+        session_pty_data = PTY_SESSIONS.setdefault(scenario_session_id, {"clients": set(), "ssh_conn": None, "ssh_process": None})
+        session_pty_data["clients"].add(sid)
+        log.info(f"SocketIO: Client SID {sid} joined scenario room: {scenario_session_id}")
+
+        await self._connect_participant(sid, scenario_session_id, log)
+
+    async def _connect_participant(self, sid, scenario_session_id, log):
+        """Resumes the session if it is suspended, then attaches sid to its SSH PTY (connecting it if needed)."""
+        session_pty_data = PTY_SESSIONS[scenario_session_id]
+        # Resume runs in a worker thread, so concurrent joins/keystrokes would race it: one resume/connect per session at a time
+        async with session_pty_data.setdefault("connect_lock", asyncio.Lock()):
+            if SCENARIO_SESSIONS[scenario_session_id].get("status") != "provisioned":
+                if not await resume_scenario_session(self.config, scenario_session_id, sid):
+                    return
+
+            if session_pty_data.get("ssh_process"):
+                log.info(f"SocketIO: Client {sid} rejoining active SSH for {scenario_session_id}")
+                await self.emit('pty-output', {"output": f"\r\nRejoined active session for '{SCENARIO_SESSIONS[scenario_session_id]['repo']}'.\r\n"}, to=sid)
+                session_pty_data["ssh_process"].stdin.write("\n")
+                return
+
+            await self.emit('pty-output', {"output": f"\r\nJoining scenario '{SCENARIO_SESSIONS[scenario_session_id]['repo']}'. Establishing SSH connection...\r\n"}, to=sid)
+            scenario_data = SCENARIO_SESSIONS[scenario_session_id]
+            instance_ip = scenario_data.get("instance_ip")
+            private_key_pem_str = scenario_data.get("private_key_pem_content")
+            if not instance_ip or not private_key_pem_str:
+                log.error(f"SocketIO: SSH Config error for session {scenario_session_id}: Missing IP or PEM.")
+                await self.emit('pty-output', {"output": "\r\nError: Instance IP or private key not found for this session.\r\n"}, to=sid)
+                await self.disconnect(sid)
+                return
+
+            try:
+                username = scenario_data.get("ssh_username", "ec2-user")
+                ssh_conn = await asyncssh.connect(
+                    instance_ip, port=scenario_data.get("ssh_port", 22), username=username, client_keys=[asyncssh.import_private_key(private_key_pem_str)],
+                    known_hosts=None, agent_path=None, connect_timeout=30
+                )
+                session_pty_data["ssh_conn"] = ssh_conn  # Stored right away so a failing create_process doesn't leak it
+                ssh_process = await ssh_conn.create_process(
+                    term_type='xterm-256color', term_size=(80, 24), stderr=asyncssh.STDOUT, encoding='utf-8', errors='replace'
+                )
+                session_pty_data["ssh_process"] = ssh_process
+                session_pty_data["reader_task"] = asyncio.create_task(ssh_output_reader(scenario_session_id, ssh_process))
+                log.info(f"SocketIO: SSH connection and PTY established for session {scenario_session_id}.")
+            except Exception as e:
+                log.error(f"SocketIO: SSH connection or PTY setup FAILED for {scenario_session_id}: {e}")
+                log_session_detail(scenario_session_id, 'ssh', 'SSH setup traceback', traceback.format_exc())
+                await self.emit('pty-output', {"output": f"\r\nSSH Connection Error: {str(e)}\r\n"}, to=sid)
+                _close_ssh_connection(scenario_session_id)
+
+    async def on_terminalInput(self, sid, data):
+        scenario_session_id = data.get('sessionId')
+        input_data = data.get('input', '')
+        if not scenario_session_id:
+            return {"status": "error", "message": "No sessionId provided with input"}
+        if get_role(scenario_session_id, sid) != ROLE_PARTICIPANT:
+            return {"status": "error", "message": "Not a participant of this session (read-only)"}
+
+        wake_action = input_while_suspended_action(scenario_session_id)
+        if wake_action == "resume":
+            # The keystroke only wakes the session; the participant types again once SSH is back
+            log = session_logger(logger, scenario_session_id, 'ssh')
+            log.info(f"SocketIO Input: Client {sid} resuming suspended session {scenario_session_id}")
+            await self._connect_participant(sid, scenario_session_id, log)
+            return {"status": "resumed"}
+        if wake_action == "busy":
+            return {"status": "error", "message": "Session is being suspended or resumed"}
+
+        ssh_process = PTY_SESSIONS.get(scenario_session_id, {}).get("ssh_process")
+        if not ssh_process:
+            logger.warning(f"SocketIO Input: terminalInput for unknown/inactive PTY session {scenario_session_id} from {sid}", extra=RATE_LIMITED)
+            await self.emit('pty-output', {'output': '\r\nError: Session not active or channel invalid.\r\n'}, to=sid)
+            return {"status": "error", "message": "Session not active or channel invalid"}
+        try:
+            record_input(scenario_session_id)
+            ssh_process.stdin.write(input_data)
+            return {"status": "ok", "bytes_sent": len(input_data)}
+        except Exception as e:
+            logger.error(f"SocketIO Input: Error writing to SSH PTY for {scenario_session_id}: {e}", exc_info=True)
+            await self.emit('pty-output', {'output': f'\r\n[Server Error: Could not send input: {e}]\r\n'}, to=sid)
+            return {"status": "error", "message": f"Server error sending input: {str(e)}"}
+
+    async def on_resize(self, sid, data):
+        scenario_session_id = data.get('sessionId')
+        rows = data.get('rows')
+        cols = data.get('cols')
+        if not all([scenario_session_id, isinstance(rows, int), isinstance(cols, int)]):
+            logger.warning(f"SocketIO Resize: Invalid data from {sid}: {data}", extra=RATE_LIMITED)
+            return
+        if get_role(scenario_session_id, sid) != ROLE_PARTICIPANT:
+            return
+        ssh_process = PTY_SESSIONS.get(scenario_session_id, {}).get("ssh_process")
+        if ssh_process:
+            try:
+                ssh_process.change_terminal_size(cols, rows)
+            except Exception as e:
+                logger.error(f"SocketIO Resize: Error resizing PTY for {scenario_session_id}: {e}")
+
+    async def on_watch_sessions(self, sid, data):
+        reply, joined = watch_sessions(sid, data.get('sessionIds'), data.get('instructorToken'), self.config.INSTRUCTOR_TOKEN)
+        for scenario_session_id in joined:
+            await self.enter_room(sid, scenario_session_id)
+        return reply
+
+    async def on_unwatch_sessions(self, sid, data):
+        reply = unwatch_sessions(sid, data.get('sessionIds'))
+        for scenario_session_id in reply.get('unwatched', []):
+            await self.leave_room(sid, scenario_session_id)
+        return reply
+
+    async def on_disconnect_request(self, sid, data):
+        await self._handle_client_gone(sid, data.get('sessionId'))
+        await self.disconnect(sid)
+
+    async def on_disconnect(self, sid, reason=None):
+        await self._handle_client_gone(sid)
+
+    async def _handle_client_gone(self, sid, scenario_id_override=None):
+        unsubscribe_all(sid)
+        target_scenario_id = scenario_id_override
+        if not target_scenario_id:
+            target_scenario_id = next((s_id for s_id, pty in PTY_SESSIONS.items() if sid in pty["clients"]), None)
+        session_pty_data = PTY_SESSIONS.get(target_scenario_id)
+        if not session_pty_data or sid not in session_pty_data["clients"]:
+            return
+        session_pty_data["clients"].discard(sid)
+        logger.info(f"SocketIO Disconnect: Client SID {sid} removed from PTY session {target_scenario_id}. Remaining clients: {len(session_pty_data['clients'])}")
+        if session_pty_data["clients"]:
+            return
+        action = last_client_gone_action(target_scenario_id)
+        if action == "close_ssh":
+            _close_ssh_connection(target_scenario_id)
+        elif action == "cleanup":
+            logger.info(f"SocketIO Disconnect: Scheduling full cleanup for {target_scenario_id} (last PTY client, session active).")
+            spawn_in_thread(cleanup_session, target_scenario_id, on_loop(_close_pty), server_io(), logger)
+# --- END server/app/aio/terminal_events.py ---
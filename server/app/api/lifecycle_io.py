@@ -0,0 +1,15 @@
+# --- START server/app/api/lifecycle_io.py ---
+from app import socketio
+from app.lifecycle import NAMESPACE, ServerIO
+from app.fanout import broadcast_pty_output
+
+# app/lifecycle.py's ServerIO for the eventlet server. The lifecycle functions are called directly in the
+# request/event greenlet: subprocess, sockets and boto3's HTTP are green after eventlet.monkey_patch().
+
+SERVER_IO = ServerIO(
+    emit=lambda event, data, to: socketio.emit(event, data, to=to, namespace=NAMESPACE),
+    broadcast=lambda session_id, output: broadcast_pty_output(socketio, session_id, output, namespace=NAMESPACE),
+    close_room=lambda room: socketio.close_room(room, namespace=NAMESPACE),
+    spawn=lambda func, *args: socketio.start_background_task(func, *args),  # A background greenlet
+)
+# --- END server/app/api/lifecycle_io.py ---
@@ -1,25 +1,25 @@
 # --- START server/app/api/terminal_events.py ---
-import os
 import select
-import time
 import paramiko
 import io
-import subprocess
-import shutil
+import traceback
 from flask import request, current_app # Flask import was missing in one version
 from flask_socketio import emit, join_room, leave_room, disconnect, Namespace
 from app import socketio # Import the main socketio instance
-from .scenarios import SCENARIO_SESSIONS # Import from scenarios.py in the same package
-import boto3
-
-# NEW: Import remove_timer
-from app.timer_manager import remove_timer as remove_session_timer
+from app.api.lifecycle_io import SERVER_IO
+from app.lifecycle import (
+    SCENARIO_SESSIONS, cleanup_session, suspend_session, resume_session, suspend_idle_sessions,
+    check_join, last_client_gone_action, input_while_suspended_action, watch_sessions, unwatch_sessions
+)
+from app.fanout import ROLE_PARTICIPANT, ROLE_SPECTATOR, subscribe, unsubscribe_all, get_role, broadcast_pty_output
+from app.logging_setup import RATE_LIMITED, session_logger, log_session_detail
+from app.idle_manager import record_input, record_output, IDLE_CHECK_INTERVAL_SECONDS
 
 PTY_PROCESSES = {} # To store PTY process info (client, channel, greenlet)
 
 def ssh_output_reader(app_for_context, scenario_id, channel):
     with app_for_context.app_context(): # Ensure Flask app context for logging etc.
-        logger = app_for_context.logger # Use logger from passed app instance for consistency
+        logger = session_logger(app_for_context.logger, scenario_id, 'ssh') # Tags records with session_id/phase
         logger.info(f"[SSH Reader {scenario_id}]: Starting PTY output reader for channel {channel}.")
         try:
             while channel and channel.active:
@@ -29,114 +29,100 @@ def ssh_output_reader(app_for_context, scenario_id, channel):
                     if channel.recv_ready(): # Check for stdout
                         output = channel.recv(4096).decode(errors='replace')
                         if output:
-                            socketio.emit('pty-output', {'output': output}, room=scenario_id, namespace='/terminal_ws')
+                            record_output(scenario_id)
+                            broadcast_pty_output(socketio, scenario_id, output)
                         # else: # Can be noisy if channel is just idle
                         #     logger.debug(f"[SSH Reader {scenario_id}]: Channel recv_ready but got empty output.")
                     
                     if channel.recv_stderr_ready(): # Check for stderr
                         stderr_output = channel.recv_stderr(4096).decode(errors='replace')
                         if stderr_output:
-                            socketio.emit('pty-output', {'output': stderr_output}, room=scenario_id, namespace='/terminal_ws')
+                            record_output(scenario_id)
+                            broadcast_pty_output(socketio, scenario_id, stderr_output)
                 
                 if channel.exit_status_ready(): # Check if remote command/shell has exited
                     logger.info(f"[SSH Reader {scenario_id}]: Channel exit status ready. Exiting reader.")
                     break
         except paramiko.SSHException as e:
             logger.error(f"[SSH Reader {scenario_id}]: SSHException in PTY reader: {e}", exc_info=False)
-            socketio.emit('pty-output', {'output': f"\r\n[SSH Connection Error in reader: {e}]\r\n"}, room=scenario_id, namespace='/terminal_ws')
+            broadcast_pty_output(socketio, scenario_id, f"\r\n[SSH Connection Error in reader: {e}]\r\n")
         except Exception as e:
             logger.error(f"[SSH Reader {scenario_id}]: Unhandled exception in PTY reader: {e}", exc_info=True)
-            socketio.emit('pty-output', {'output': f"\r\n[Error reading from remote: {e}]\r\n"}, room=scenario_id, namespace='/terminal_ws')
+            broadcast_pty_output(socketio, scenario_id, f"\r\n[Error reading from remote: {e}]\r\n")
         finally:
             logger.info(f"[SSH Reader {scenario_id}]: PTY output reader stopped for channel {channel}.")
             if scenario_id in PTY_PROCESSES and PTY_PROCESSES[scenario_id].get("ssh_channel") == channel:
-                 socketio.emit('pty-output', {'output': '\r\n[Terminal session may have ended or encountered an issue.]\r\n$ '}, room=scenario_id, namespace='/terminal_ws')
+                 broadcast_pty_output(socketio, scenario_id, '\r\n[Terminal session may have ended or encountered an issue.]\r\n$ ')
                  PTY_PROCESSES[scenario_id]["ssh_channel"] = None
 
 
+def _close_pty(scenario_id, logger):
+    # Full PTY teardown for cleanup_session: drops the PTY_PROCESSES entry as well
+    session_pty_data = PTY_PROCESSES.pop(scenario_id, None)
+    if not session_pty_data:
+        logger.info(f"Cleanup: No PTY process data found for {scenario_id} (already cleaned or never existed).")
+        return
+    for resource, closer in ((session_pty_data.get("ssh_channel"), "close"), (session_pty_data.get("ssh_client"), "close"), (session_pty_data.get("reader_greenlet"), "kill")):
+        if resource and hasattr(resource, closer):
+            try:
+                getattr(resource, closer)()
+            except Exception as e:
+                logger.error(f"Cleanup: Error during SSH {closer} for {scenario_id}: {e}")
+    logger.info(f"Cleanup: PTY resources processed for {scenario_id}.")
+
+
+def _close_ssh_connection(scenario_id, logger):
+    # Closes SSH but keeps the PTY_PROCESSES entry (and its clients) so a later join or keystroke can reconnect
+    session_pty_data = PTY_PROCESSES.get(scenario_id)
+    if not session_pty_data:
+        return
+    channel = session_pty_data.get("ssh_channel")
+    session_pty_data["ssh_channel"] = None # Set first so the reader doesn't report a broken session
+    ssh_client = session_pty_data.get("ssh_client")
+    session_pty_data["ssh_client"] = None
+    reader_greenlet = session_pty_data.get("reader_greenlet")
+    session_pty_data["reader_greenlet"] = None
+    for resource, closer in ((channel, "close"), (ssh_client, "close"), (reader_greenlet, "kill")):
+        if resource and hasattr(resource, closer):
+            try:
+                getattr(resource, closer)()
+            except Exception as e:
+                logger.error(f"Idle: Error during SSH {closer} for {scenario_id}: {e}")
+
+
 def cleanup_scenario_session(app_for_context, scenario_id): # Renamed function to match call from on_disconnect
-    with app_for_context.app_context():
-        logger = app_for_context.logger # Use logger from passed app instance
-        logger.info(f"Cleanup: Starting for scenario session: {scenario_id}")
-
-        # NEW: Remove timer early in the cleanup process
-        was_timer_removed = remove_session_timer(scenario_id, app_logger=logger)
-        if was_timer_removed:
-            logger.info(f"Cleanup: Timer removed for session {scenario_id}.")
-        # else: # This is fine if timer was already gone or never set for this session
-        #     logger.debug(f"Cleanup: No timer found to remove for session {scenario_id}, or already removed.")
-
-        # Clean up PTY process data
-        session_pty_data = PTY_PROCESSES.pop(scenario_id, None)
-        if session_pty_data:
-            channel = session_pty_data.get("ssh_channel")
-            if channel:
-                try: 
-                    logger.info(f"Cleanup: Closing SSH channel for {scenario_id}")
-                    channel.close()
-                except Exception as e: logger.error(f"Cleanup: Error closing SSH channel for {scenario_id}: {e}")
-            
-            ssh_client = session_pty_data.get("ssh_client")
-            if ssh_client:
-                try: 
-                    logger.info(f"Cleanup: Closing SSH client for {scenario_id}")
-                    ssh_client.close()
-                except Exception as e: logger.error(f"Cleanup: Error closing SSH client for {scenario_id}: {e}")
-            
-            reader_greenlet = session_pty_data.get("reader_greenlet")
-            if reader_greenlet and hasattr(reader_greenlet, 'kill'):
-                 try:
-                     logger.info(f"Cleanup: Attempting to kill reader greenlet for {scenario_id}")
-                     reader_greenlet.kill()
-                 except Exception as e:
-                     logger.error(f"Cleanup: Error killing reader greenlet for {scenario_id}: {e}")
-            logger.info(f"Cleanup: PTY resources processed for {scenario_id}.")
-        else:
-            logger.info(f"Cleanup: No PTY process data found for {scenario_id} (already cleaned or never existed).")
+    return cleanup_session(scenario_id, _close_pty, SERVER_IO, app_for_context.logger)
 
 
-        # Clean up scenario metadata and Terraform resources
-        scenario_meta_data = SCENARIO_SESSIONS.pop(scenario_id, None)
-        if scenario_meta_data:
-            tf_dir = scenario_meta_data.get("terraform_dir")
-            terraform_name_prefix_var = scenario_meta_data.get("terraform_name_prefix_for_run", scenario_id) 
+def suspend_scenario_session(app_for_context, scenario_id):
+    """Stops an idle session's instances, closing SSH and pausing its timer. Returns True if suspended."""
+    return suspend_session(
+        scenario_id, app_for_context.config.get('EC2_ENDPOINT_URL'), _close_ssh_connection, SERVER_IO, app_for_context.logger
+    )
 
-            if tf_dir and os.path.exists(tf_dir):
-                logger.info(f"Cleanup: Running terraform destroy for {scenario_id} (prefix: {terraform_name_prefix_var}) in {tf_dir}")
-                try:
-                    destroy_cmd = ['terraform', 'destroy', '--auto-approve', '-no-color', '-input=false']
-                    # For Step A, we don't differentiate parallelism yet based on timer. That's Step D.
-                    destroy_result = subprocess.run(destroy_cmd, cwd=tf_dir, capture_output=True, text=True, timeout=600) # 10 min timeout
-                    if destroy_result.returncode == 0:
-                        logger.info(f"Cleanup: Terraform destroy successful for {scenario_id}:\n{destroy_result.stdout}")
-                    else:
-                        logger.error(f"Cleanup: Terraform destroy FAILED for {scenario_id}. Code: {destroy_result.returncode}\nStderr:\n{destroy_result.stderr}\nStdout:\n{destroy_result.stdout}")
-                    
-                    aws_key_name = scenario_meta_data.get("key_name_aws")
-                    if aws_key_name:
-                        logger.info(f"Cleanup: Attempting to delete AWS key pair: {aws_key_name}")
-                        try:
-                            ec2_client = boto3.client('ec2')
-                            ec2_client.delete_key_pair(KeyName=aws_key_name)
-                            logger.info(f"Cleanup: Successfully deleted AWS key pair: {aws_key_name}")
-                        except Exception as key_del_e:
-                            logger.error(f"Cleanup: Failed to delete AWS key pair {aws_key_name}: {key_del_e}")
-                    else:
-                        logger.warning(f"Cleanup: No 'key_name_aws' in metadata for {scenario_id}, skipping key deletion.")
-
-                    logger.info(f"Cleanup: Attempting to remove directory: {tf_dir}")
-                    shutil.rmtree(tf_dir, ignore_errors=True)
-                    logger.info(f"Cleanup: Removed directory {tf_dir}")
-
-                except subprocess.TimeoutExpired:
-                    logger.error(f"Cleanup: Terraform destroy timed out for {scenario_id} in {tf_dir}")
-                except Exception as e:
-                    logger.error(f"Cleanup: Error during terraform destroy or directory cleanup for {scenario_id} in {tf_dir}: {e}", exc_info=True)
-            else:
-                logger.warning(f"Cleanup: Terraform directory '{tf_dir}' not found or not specified for cleanup of {scenario_id}")
-        else:
-            logger.warning(f"Cleanup: No scenario metadata (SCENARIO_SESSIONS) found for {scenario_id} (already cleaned or never existed).")
-        logger.info(f"Cleanup: Full cleanup process finished for scenario session {scenario_id}")
+
+def resume_scenario_session(app_for_context, scenario_id, client_sid):
+    """Starts a suspended session's instances again. Returns True when the session is ready for an SSH connection."""
+    return resume_session(
+        scenario_id, client_sid, app_for_context.config.get('EC2_ENDPOINT_URL'), SERVER_IO, app_for_context.logger
+    )
+
+
+def idle_monitor(app_for_context):
+    idle_seconds = app_for_context.config.get('IDLE_SUSPEND_SECONDS')
+    if not idle_seconds:
+        app_for_context.logger.info("Idle: Idle suspend disabled (IDLE_SUSPEND_SECONDS=0).")
+        return
+    app_for_context.logger.info(f"Idle: Monitor started, suspending sessions idle for {idle_seconds}s.")
+    while True:
+        socketio.sleep(IDLE_CHECK_INTERVAL_SECONDS)
+        suspend_idle_sessions(
+            idle_seconds, app_for_context.config.get('EC2_ENDPOINT_URL'), _close_ssh_connection, SERVER_IO, app_for_context.logger
+        )
+
+
+def start_idle_monitor(app_for_context):
+    return socketio.start_background_task(idle_monitor, app_for_context)
 
 
 class TerminalNamespace(Namespace):
@@ -148,30 +134,56 @@ class TerminalNamespace(Namespace):
     def on_join_scenario(self, data):
         client_sid = request.sid
         scenario_session_id = data.get('sessionId')
-        current_app.logger.info(f"SocketIO: Client {client_sid} attempting to join scenario: {scenario_session_id}")
-
-        if not scenario_session_id or scenario_session_id not in SCENARIO_SESSIONS:
-            current_app.logger.error(f"SocketIO: Client {client_sid} - Invalid/unknown scenario session ID: {scenario_session_id}")
-            emit('pty-output', {"output": f"\r\nError: Invalid or unknown scenario session ID: {scenario_session_id}\r\n"})
-            disconnect(sid=client_sid) 
+        role = data.get('role', ROLE_PARTICIPANT)
+        current_app.logger.info(f"SocketIO: Client {client_sid} attempting to join scenario: {scenario_session_id} as {role}")
+
+        error_message, disconnect_client = check_join(
+            scenario_session_id, role, data.get('instructorToken'), current_app.config.get('INSTRUCTOR_TOKEN')
+        )
+        if error_message:
+            current_app.logger.error(f"SocketIO: Client {client_sid} - Rejected join of {scenario_session_id} as {role}: {error_message.strip()}")
+            emit('pty-output', {"output": error_message})
+            if disconnect_client:
+                disconnect(sid=client_sid)
+            return
+        log = session_logger(current_app.logger, scenario_session_id, 'ssh') # Tags records with session_id/phase (known sessions only)
+
+        if role == ROLE_SPECTATOR:
+            # Spectators only receive output: they don't own the PTY, don't count towards cleanup and never open SSH
+            subscribe(scenario_session_id, client_sid, ROLE_SPECTATOR)
+            join_room(scenario_session_id, sid=client_sid, namespace=self.namespace) # Output goes to the session's room
+            pty_channel = PTY_PROCESSES.get(scenario_session_id, {}).get("ssh_channel")
+            status = "live" if pty_channel and pty_channel.active else "waiting for the participant to connect"
+            log.info(f"SocketIO: Client SID {client_sid} spectating scenario {scenario_session_id} ({status})")
+            emit('pty-output', {"output": f"\r\nSpectating '{SCENARIO_SESSIONS[scenario_session_id]['repo']}' (read-only, {status}).\r\n"}, room=client_sid)
             return
 
         join_room(scenario_session_id, sid=client_sid, namespace=self.namespace)
-        current_app.logger.info(f"SocketIO: Client SID {client_sid} joined scenario room: {scenario_session_id}")
+        subscribe(scenario_session_id, client_sid, ROLE_PARTICIPANT)
+        log.info(f"SocketIO: Client SID {client_sid} joined scenario room: {scenario_session_id}")
 
         if scenario_session_id not in PTY_PROCESSES:
             PTY_PROCESSES[scenario_session_id] = {"clients": set(), "ssh_client": None, "ssh_channel": None, "reader_greenlet": None}
         
         PTY_PROCESSES[scenario_session_id]["clients"].add(client_sid)
+
+        self._connect_participant(client_sid, scenario_session_id, log)
+
+    def _connect_participant(self, client_sid, scenario_session_id, log):
+        """Resumes the session if it is suspended, then attaches client_sid to its SSH PTY (connecting it if needed)."""
+        if SCENARIO_SESSIONS[scenario_session_id].get("status") != "provisioned":
+            # Suspended by the idle monitor: start the instances again, then connect SSH as usual below
+            if not resume_scenario_session(current_app._get_current_object(), scenario_session_id, client_sid):
+                return
         
         session_pty_data = PTY_PROCESSES[scenario_session_id]
         if session_pty_data.get("ssh_channel") and session_pty_data["ssh_channel"].active:
-            current_app.logger.info(f"SocketIO: Client {client_sid} rejoining active SSH for {scenario_session_id}")
+            log.info(f"SocketIO: Client {client_sid} rejoining active SSH for {scenario_session_id}")
             emit('pty-output', {"output": f"\r\nRejoined active session for '{SCENARIO_SESSIONS[scenario_session_id]['repo']}'.\r\n"}, room=client_sid)
             try:
                 session_pty_data["ssh_channel"].send("\n") 
             except Exception as e:
-                current_app.logger.warning(f"SocketIO: Could not send newline to re-joined channel for {scenario_session_id}: {e}")
+                log.warning(f"SocketIO: Could not send newline to re-joined channel for {scenario_session_id}: {e}")
             return
 
         emit('pty-output', {"output": f"\r\nJoining scenario '{SCENARIO_SESSIONS[scenario_session_id]['repo']}'. Establishing SSH connection...\r\n"}, room=client_sid)
@@ -182,7 +194,7 @@ class TerminalNamespace(Namespace):
 
         if not instance_ip or not private_key_pem_str:
             msg = "\r\nError: Instance IP or private key not found for this session.\r\n"
-            current_app.logger.error(f"SocketIO: SSH Config error for session {scenario_session_id}: Missing IP or PEM.")
+            log.error(f"SocketIO: SSH Config error for session {scenario_session_id}: Missing IP or PEM.")
             emit('pty-output', {"output": msg}, room=client_sid)
             disconnect(sid=client_sid)
             return
@@ -199,20 +211,20 @@ class TerminalNamespace(Namespace):
                 try:
                     private_key_file.seek(0) # Reset for each attempt
                     pkey = key_type_class.from_private_key(private_key_file)
-                    current_app.logger.info(f"SocketIO: Loaded private key as {key_type_class.__name__} for {scenario_session_id}.")
+                    log.info(f"SocketIO: Loaded private key as {key_type_class.__name__} for {scenario_session_id}.")
                     break 
                 except paramiko.SSHException as e:
                     key_load_error = e # Store last error
                     continue 
             private_key_file.close()
             if not pkey:
-                current_app.logger.error(f"SocketIO: Failed to load private key with any known type for {scenario_session_id}. Last error: {key_load_error}")
+                log.error(f"SocketIO: Failed to load private key with any known type for {scenario_session_id}. Last error: {key_load_error}")
                 raise paramiko.SSHException(f"Could not load private key. Last error: {key_load_error}")
 
 
-            username = "ec2-user"
-            current_app.logger.info(f"SocketIO: Attempting SSH to {username}@{instance_ip} for session {scenario_session_id} (Key: {type(pkey).__name__})")
-            ssh_client.connect(hostname=instance_ip, username=username, pkey=pkey, timeout=30, look_for_keys=False, allow_agent=False)
+            username = scenario_data.get("ssh_username", "ec2-user")
+            log.info(f"SocketIO: Attempting SSH to {username}@{instance_ip} for session {scenario_session_id} (Key: {type(pkey).__name__})")
+            ssh_client.connect(hostname=instance_ip, port=scenario_data.get("ssh_port", 22), username=username, pkey=pkey, timeout=30, look_for_keys=False, allow_agent=False)
             
             channel = ssh_client.invoke_shell(term='xterm-256color', width=80, height=24)
             channel.settimeout(0.0) # Non-blocking
@@ -228,10 +240,11 @@ class TerminalNamespace(Namespace):
                 channel=channel
             )
             session_pty_data["reader_greenlet"] = reader_greenlet
-            current_app.logger.info(f"SocketIO: SSH connection and PTY established for session {scenario_session_id}.")
+            log.info(f"SocketIO: SSH connection and PTY established for session {scenario_session_id}.")
         
         except Exception as e:
-            current_app.logger.error(f"SocketIO: SSH connection or PTY setup FAILED for {scenario_session_id}: {e}", exc_info=True)
+            log.error(f"SocketIO: SSH connection or PTY setup FAILED for {scenario_session_id}: {e}")
+            log_session_detail(scenario_session_id, 'ssh', 'SSH setup traceback', traceback.format_exc())
             emit('pty-output', {"output": f"\r\nSSH Connection Error: {str(e)}\r\n"}, room=client_sid)
             if session_pty_data.get("ssh_client"):
                 session_pty_data["ssh_client"].close()
@@ -249,8 +262,21 @@ class TerminalNamespace(Namespace):
             current_app.logger.error(f"SocketIO Input: No sessionId in terminalInput from {client_sid}")
             return {"status": "error", "message": "No sessionId provided with input"}
 
+        if get_role(scenario_session_id, client_sid) != ROLE_PARTICIPANT:
+            return {"status": "error", "message": "Not a participant of this session (read-only)"}
+
+        wake_action = input_while_suspended_action(scenario_session_id)
+        if wake_action == "resume":
+            # The keystroke only wakes the session; the participant types again once SSH is back
+            log = session_logger(current_app.logger, scenario_session_id, 'ssh')
+            log.info(f"SocketIO Input: Client {client_sid} resuming suspended session {scenario_session_id}")
+            self._connect_participant(client_sid, scenario_session_id, log)
+            return {"status": "resumed"}
+        if wake_action == "busy":
+            return {"status": "error", "message": "Session is being suspended or resumed"}
+
         if scenario_session_id not in PTY_PROCESSES or not PTY_PROCESSES[scenario_session_id].get("ssh_channel"):
-            current_app.logger.warning(f"SocketIO Input: terminalInput for unknown/inactive PTY session {scenario_session_id} from {client_sid}")
+            current_app.logger.warning(f"SocketIO Input: terminalInput for unknown/inactive PTY session {scenario_session_id} from {client_sid}", extra=RATE_LIMITED)
             emit('pty-output', {'output': '\r\nError: Session not active or channel invalid.\r\n'}, room=client_sid) 
             return {"status": "error", "message": "Session not active or channel invalid"}
 
@@ -259,16 +285,17 @@ class TerminalNamespace(Namespace):
 
         if channel and channel.active:
             try:
+                record_input(scenario_session_id)
                 bytes_sent = channel.send(input_data) 
                 if not input_data and bytes_sent == 0: pass 
-                elif bytes_sent == 0 and input_data: current_app.logger.warning(f"SocketIO Input: Sent 0 bytes for non-empty input for {scenario_session_id}.")
+                elif bytes_sent == 0 and input_data: current_app.logger.warning(f"SocketIO Input: Sent 0 bytes for non-empty input for {scenario_session_id}.", extra=RATE_LIMITED)
                 return {"status": "ok", "bytes_sent": bytes_sent}
             except Exception as e:
                 current_app.logger.error(f"SocketIO Input: Error writing to SSH PTY for {scenario_session_id}: {e}", exc_info=True)
                 emit('pty-output', {'output': f'\r\n[Server Error: Could not send input: {e}]\r\n'}, room=client_sid)
                 return {"status": "error", "message": f"Server error sending input: {str(e)}"}
         else:
-            current_app.logger.warning(f"SocketIO Input: No active SSH PTY channel for session {scenario_session_id}. Input: {input_data!r}")
+            current_app.logger.warning(f"SocketIO Input: No active SSH PTY channel for session {scenario_session_id}. Input: {input_data!r}", extra=RATE_LIMITED)
             emit('pty-output', {'output': '\r\nTerminal session not active or not fully initialized.\r\n'}, room=client_sid)
             return {"status": "error", "message": "No active channel"}
 
@@ -277,14 +304,18 @@ class TerminalNamespace(Namespace):
         scenario_session_id = data.get('sessionId')
         rows = data.get('rows')
         cols = data.get('cols')
-        current_app.logger.debug(f"SocketIO Resize: SID {client_sid} for {scenario_session_id}. Rows: {rows}, Cols: {cols}")
+        current_app.logger.debug(f"SocketIO Resize: SID {client_sid} for {scenario_session_id}. Rows: {rows}, Cols: {cols}", extra=RATE_LIMITED)
 
         if not all([scenario_session_id, isinstance(rows, int), isinstance(cols, int)]):
             current_app.logger.warning(f"SocketIO Resize: Invalid data from {client_sid}: {data}")
             return
 
+        if get_role(scenario_session_id, client_sid) != ROLE_PARTICIPANT:
+            current_app.logger.debug(f"SocketIO Resize: Ignored from non-participant {client_sid} for {scenario_session_id}", extra=RATE_LIMITED)
+            return
+
         if scenario_session_id not in PTY_PROCESSES or not PTY_PROCESSES[scenario_session_id].get("ssh_channel"):
-            current_app.logger.warning(f"SocketIO Resize: For unknown/inactive PTY session {scenario_session_id} from {client_sid}")
+            current_app.logger.warning(f"SocketIO Resize: For unknown/inactive PTY session {scenario_session_id} from {client_sid}", extra=RATE_LIMITED)
             return
 
         session_info = PTY_PROCESSES[scenario_session_id]
@@ -293,12 +324,31 @@ class TerminalNamespace(Namespace):
         if channel and channel.active:
             try:
                 channel.resize_pty(width=cols, height=rows)
-                current_app.logger.info(f"SocketIO Resize: Resized PTY for {scenario_session_id} (client {client_sid}) to {cols}x{rows}")
+                current_app.logger.debug(f"SocketIO Resize: Resized PTY for {scenario_session_id} (client {client_sid}) to {cols}x{rows}", extra=RATE_LIMITED)
             except Exception as e:
                 current_app.logger.error(f"SocketIO Resize: Error resizing PTY for {scenario_session_id}: {e}")
         else:
-            current_app.logger.warning(f"SocketIO Resize: Attempt for {scenario_session_id} but no active channel.")
+            current_app.logger.warning(f"SocketIO Resize: Attempt for {scenario_session_id} but no active channel.", extra=RATE_LIMITED)
     
+    def on_watch_sessions(self, data):
+        # Dashboard subscription: one socket receives read-only output of many sessions, each frame tagged with sessionId
+        client_sid = request.sid
+        reply, joined = watch_sessions(
+            client_sid, data.get('sessionIds'), data.get('instructorToken'), current_app.config.get('INSTRUCTOR_TOKEN')
+        )
+        for scenario_session_id in joined:
+            join_room(scenario_session_id, sid=client_sid, namespace=self.namespace)
+        current_app.logger.info(f"SocketIO Watch: Client SID {client_sid} watch request: {reply.get('message', 'ok')}, now watching {len(joined)} more sessions.")
+        return reply
+
+    def on_unwatch_sessions(self, data):
+        client_sid = request.sid
+        reply = unwatch_sessions(client_sid, data.get('sessionIds'))
+        for scenario_session_id in reply.get('unwatched', []):
+            leave_room(scenario_session_id, sid=client_sid, namespace=self.namespace)
+        current_app.logger.info(f"SocketIO Unwatch: Client SID {client_sid} stopped watching {len(reply.get('unwatched', []))} sessions.")
+        return reply
+
     def on_disconnect_request(self, data):
         client_sid = request.sid
         scenario_session_id = data.get('sessionId')
@@ -311,6 +361,7 @@ class TerminalNamespace(Namespace):
     def on_disconnect(self, manual_scenario_id_override=None):
         client_sid = request.sid
         current_app.logger.info(f"SocketIO Disconnect: Processing for Client SID {client_sid}. Override ID: {manual_scenario_id_override}")
+        unsubscribe_all(client_sid)
         
         scenario_to_cleanup_if_last = None
         target_scenario_id_for_client = manual_scenario_id_override
@@ -333,7 +384,12 @@ class TerminalNamespace(Namespace):
             current_app.logger.info(f"SocketIO Disconnect: Client SID {client_sid}. No PTY session for '{target_scenario_id_for_client}'.")
 
         if scenario_to_cleanup_if_last:
-            if scenario_to_cleanup_if_last in SCENARIO_SESSIONS: # Check if main scenario session still active
+            action = last_client_gone_action(scenario_to_cleanup_if_last)
+            if action == "close_ssh":
+                # Seeded sessions (benchmarks / local SSH hosts) have no terraform resources: only drop the SSH connection
+                current_app.logger.info(f"SocketIO Disconnect: Closing SSH for seeded session {scenario_to_cleanup_if_last}, keeping it registered.")
+                _close_ssh_connection(scenario_to_cleanup_if_last, current_app.logger)
+            elif action == "cleanup": # Main scenario session still active
                 app_for_bg_task = current_app._get_current_object()
                 current_app.logger.info(f"SocketIO Disconnect: Scheduling full cleanup for {scenario_to_cleanup_if_last} (last PTY client, session active).")
                 socketio.start_background_task(
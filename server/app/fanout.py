@@ -0,0 +1,82 @@
+# --- START server/app/fanout.py ---
+import threading
+
+# Tracks who receives a scenario's PTY output and in which role, and pushes each output chunk to them.
+# Participants (the terminal owner) and spectators (instructors, dashboards) are both subscribers and both
+# join the Socket.IO room named after the session; only participants may send terminalInput/resize.
+
+ROLE_PARTICIPANT = "participant"
+ROLE_SPECTATOR = "spectator"
+ROLES = (ROLE_PARTICIPANT, ROLE_SPECTATOR)
+
+SUBSCRIBERS = {}  # Stores session_id: {client_sid: role}
+SUBSCRIBERS_LOCK = threading.Lock()  # Lock for thread-safe access to SUBSCRIBERS
+
+
+def subscribe(session_id, client_sid, role):
+    """Subscribes client_sid to session_id's output. A participant is never downgraded to spectator."""
+    with SUBSCRIBERS_LOCK:
+        session_subscribers = SUBSCRIBERS.setdefault(session_id, {})
+        if session_subscribers.get(client_sid) != ROLE_PARTICIPANT:
+            session_subscribers[client_sid] = role
+        return session_subscribers[client_sid]
+
+
+def unsubscribe(session_id, client_sid):
+    with SUBSCRIBERS_LOCK:
+        session_subscribers = SUBSCRIBERS.get(session_id)
+        if session_subscribers and session_subscribers.pop(client_sid, None):
+            if not session_subscribers:
+                del SUBSCRIBERS[session_id]
+            return True
+        return False
+
+
+def unsubscribe_all(client_sid):
+    """Removes client_sid from every session it watches. Returns the affected session IDs."""
+    with SUBSCRIBERS_LOCK:
+        affected = []
+        for session_id in list(SUBSCRIBERS):
+            if SUBSCRIBERS[session_id].pop(client_sid, None):
+                affected.append(session_id)
+                if not SUBSCRIBERS[session_id]:
+                    del SUBSCRIBERS[session_id]
+        return affected
+
+
+def drop_session(session_id):
+    """Forgets all subscribers of a session (called on cleanup)."""
+    with SUBSCRIBERS_LOCK:
+        return SUBSCRIBERS.pop(session_id, None)
+
+
+def get_role(session_id, client_sid):
+    with SUBSCRIBERS_LOCK:
+        return SUBSCRIBERS.get(session_id, {}).get(client_sid)
+
+
+def count_subscribers(session_id):
+    with SUBSCRIBERS_LOCK:
+        return len(SUBSCRIBERS.get(session_id, {}))
+
+
+def spectated_sessions(client_sid):
+    """Session IDs client_sid is subscribed to as a spectator."""
+    with SUBSCRIBERS_LOCK:
+        return [session_id for session_id, session_subscribers in SUBSCRIBERS.items() if session_subscribers.get(client_sid) == ROLE_SPECTATOR]
+
+
+def broadcast_pty_output(socketio, session_id, output, namespace="/terminal_ws"):
+    """
+    Sends one 'pty-output' frame to the session's room, which participants and spectators both join.
+    python-socketio encodes a room emit once and reuses the packet for every member, and going through the
+    client manager keeps this working with a message-queue manager across several server processes.
+    The payload carries sessionId so a dashboard watching many sessions on one socket can demultiplex.
+    """
+    socketio.emit('pty-output', {"output": output, "sessionId": session_id}, to=session_id, namespace=namespace)
+
+
+async def broadcast_pty_output_async(sio, session_id, output, namespace="/terminal_ws"):
+    """broadcast_pty_output for the asyncio server mode, where sio is a socketio.AsyncServer."""
+    await sio.emit('pty-output', {"output": output, "sessionId": session_id}, to=session_id, namespace=namespace)
+# --- END server/app/fanout.py ---
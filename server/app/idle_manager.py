@@ -0,0 +1,107 @@
+# --- START server/app/idle_manager.py ---
+import json
+import time
+import socket
+import threading
+import subprocess
+from app.placement import boto3_session_for
+
+# Tracks per-session PTY activity and stops/starts a scenario's EC2 instances when it goes idle.
+# The suspend/resume flows are in lifecycle.py; closing SSH and resuming on join live in the terminal_events modules.
+
+SESSION_ACTIVITY = {}  # Stores session_id: {"input": unix_ts, "output": unix_ts}
+ACTIVITY_LOCK = threading.Lock()  # Lock for thread-safe access to SESSION_ACTIVITY
+
+IDLE_CHECK_INTERVAL_SECONDS = 30
+SSH_READY_TIMEOUT_SECONDS = 180
+INSTANCE_WAITER_CONFIG = {'Delay': 5, 'MaxAttempts': 60}  # Up to 5 minutes per state change
+
+
+def record_input(session_id):
+    with ACTIVITY_LOCK:
+        SESSION_ACTIVITY.setdefault(session_id, {"input": 0.0, "output": 0.0})["input"] = time.time()
+
+
+def record_output(session_id):
+    with ACTIVITY_LOCK:
+        SESSION_ACTIVITY.setdefault(session_id, {"input": 0.0, "output": 0.0})["output"] = time.time()
+
+
+def clear_activity(session_id):
+    with ACTIVITY_LOCK:
+        return SESSION_ACTIVITY.pop(session_id, None) is not None
+
+
+def find_idle_sessions(idle_seconds, now=None):
+    """Returns session IDs with no PTY input or output for at least idle_seconds."""
+    now = now if now is not None else time.time()
+    with ACTIVITY_LOCK:
+        return [
+            session_id for session_id, activity in SESSION_ACTIVITY.items()
+            if now - max(activity["input"], activity["output"]) >= idle_seconds
+        ]
+
+
+def ec2_client_for(placement, endpoint_url=None):
+    """EC2 client for a session's placement. endpoint_url points boto3 at a local EC2 stand-in (e.g. moto_server)."""
+    return boto3_session_for(placement).client('ec2', endpoint_url=endpoint_url or None)
+
+
+def get_scenario_instance_ids(tf_dir):
+    """Returns the IDs of every aws_instance in the scenario's terraform state (root and child modules)."""
+    show_result = subprocess.run(
+        ['terraform', 'show', '-json', '-no-color'],
+        capture_output=True, text=True, cwd=tf_dir, timeout=120, check=True
+    )
+    state = json.loads(show_result.stdout or '{}')
+    instance_ids = []
+    pending_modules = [state.get('values', {}).get('root_module', {})]
+    while pending_modules:
+        module = pending_modules.pop()
+        for resource in module.get('resources', []):
+            if resource.get('type') == 'aws_instance' and resource.get('values', {}).get('id'):
+                instance_ids.append(resource['values']['id'])
+        pending_modules.extend(module.get('child_modules', []))
+    return instance_ids
+
+
+def find_instance_by_public_ip(ec2_client, instance_ids, public_ip):
+    """Returns the ID of the instance among instance_ids whose public IP is public_ip, or None."""
+    response = ec2_client.describe_instances(InstanceIds=instance_ids)
+    for reservation in response.get('Reservations', []):
+        for instance in reservation.get('Instances', []):
+            if instance.get('PublicIpAddress') == public_ip:
+                return instance['InstanceId']
+    return None
+
+
+def stop_instances(ec2_client, instance_ids, logger):
+    logger.info(f"Idle: Stopping instances {instance_ids}")
+    ec2_client.stop_instances(InstanceIds=instance_ids)
+
+
+def start_instances(ec2_client, instance_ids, ssh_instance_id, logger):
+    """
+    Starts the instances, waits until they are running and returns the (possibly new)
+    public IP of ssh_instance_id. Instances without an EIP get a new public IP on every start.
+    """
+    # stop_instances only requests the stop; EC2 rejects StartInstances while an instance is still 'stopping'
+    ec2_client.get_waiter('instance_stopped').wait(InstanceIds=instance_ids, WaiterConfig=INSTANCE_WAITER_CONFIG)
+    logger.info(f"Idle: Starting instances {instance_ids}")
+    ec2_client.start_instances(InstanceIds=instance_ids)
+    ec2_client.get_waiter('instance_running').wait(InstanceIds=instance_ids, WaiterConfig=INSTANCE_WAITER_CONFIG)
+    response = ec2_client.describe_instances(InstanceIds=[ssh_instance_id])
+    return response['Reservations'][0]['Instances'][0].get('PublicIpAddress')
+
+
+def wait_for_ssh_port(host, timeout_seconds=SSH_READY_TIMEOUT_SECONDS, port=22):
+    """Polls until host accepts TCP connections on the SSH port. Returns True if it did within the timeout."""
+    deadline = time.time() + timeout_seconds
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=5):
+                return True
+        except OSError:
+            time.sleep(3)
+    return False
+# --- END server/app/idle_manager.py ---
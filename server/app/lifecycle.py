@@ -0,0 +1,665 @@
+# --- START server/app/lifecycle.py ---
+import os
+import hmac
+import json
+import glob
+import time
+import shutil
+import hashlib
+import threading
+import subprocess
+from collections import namedtuple
+from app.timer_manager import init_timer as initialize_session_timer
+from app.timer_manager import extend_timer as extend_session_timer
+from app.timer_manager import remove_timer as remove_session_timer
+from app.timer_manager import pause_timer as pause_session_timer
+from app.timer_manager import resume_timer as resume_session_timer
+from app.placement import (
+    ConfiguredQuotaSource, parse_placements, parse_quotas, placement_key, boto3_session_for,
+    reserve_placement, release_placement, record_provisioning_outcome, terraform_provider_args
+)
+from app.provisioning import (
+    ProvisioningCancelled, register_provisioning, finish_provisioning, claim_provisioning, request_cancel,
+    run_terraform_cancellable
+)
+from app.fanout import (
+    ROLES, ROLE_SPECTATOR, subscribe, unsubscribe, get_role, drop_session, spectated_sessions
+)
+from app.idle_manager import (
+    record_output, clear_activity, find_idle_sessions, ec2_client_for,
+    get_scenario_instance_ids, find_instance_by_public_ip, stop_instances, start_instances, wait_for_ssh_port
+)
+from app.logging_setup import session_logger, log_session_detail, close_session_log
+
+# Scenario lifecycle (provision, destroy, idle suspend/resume) shared by the eventlet and asyncio server modes.
+# These are ordinary blocking functions: the eventlet mode calls them in a greenlet (subprocess, sockets and boto3
+# are green after monkey-patching), the asyncio mode runs them in a worker thread with asyncio.to_thread.
+# What differs per mode - emitting to Socket.IO clients and starting background work - is passed in as a ServerIO;
+# see api/lifecycle_io.py and aio/lifecycle_io.py.
+
+SCENARIO_SESSIONS = {}  # Stores session_id: scenario metadata (repo, status, terraform_dir, instance_ip, placement, ...)
+STATUS_LOCK = threading.Lock()  # Makes a session's status check-and-set atomic (asyncio mode runs these in threads)
+
+NAMESPACE = '/terminal_ws'
+BASE_WORK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scenarios_work_dir')
+TERRAFORM_INIT_CMD = ['terraform', 'init', '-no-color', '-input=false']
+TERRAFORM_APPLY_CMD = ['terraform', 'apply', '--auto-approve', '-no-color', '-input=false']
+TERRAFORM_DESTROY_CMD = ['terraform', 'destroy', '--auto-approve', '-no-color', '-input=false']
+RESUME_WAIT_SECONDS = 10 * 60  # How long a join waits for another in-flight suspend/resume of the same session
+MAX_WATCHED_SESSIONS = 100  # Per socket, across watch_sessions requests
+
+BASE_TERRAFORM_TEMPLATE = """
+
+provider "aws" {{
+  region = "{aws_region}"
+  {aws_profile_line}
+}}
+
+module "base_infrastructure" {{
+  source      = "git::ssh://git@github.com/weka/Chaos-Lab.git//modules/base"
+  name_prefix = "{terraform_name_prefix}"
+}}
+
+module "scenario_chaos" {{
+  source      = "git::ssh://git@github.com/weka/Chaos-Lab.git//{scenario_module_git_path}"
+  name_prefix = "{terraform_name_prefix}"
+  subnet_id         = module.base_infrastructure.subnet_id
+  private_subnet_id = module.base_infrastructure.private_subnet_id
+  security_group_id = module.base_infrastructure.security_group_id
+  key_name          = module.base_infrastructure.keypair_name
+  random_pet_id     = module.base_infrastructure.random_pet_id
+  private_key_pem = module.base_infrastructure.private_key_pem
+  other_private_ips = module.base_infrastructure.instance_private_ips
+  other_public_ips  = module.base_infrastructure.instance_public_ips
+  iam_role_name            = module.base_infrastructure.ec2_instance_role_name
+  iam_policy_arn           = module.base_infrastructure.describe_instances_policy_arn
+  iam_instance_profile_name = module.base_infrastructure.ec2_instance_profile_name
+  ami_id                    = module.base_infrastructure.ami_id
+}}
+"""
+
+# Socket.IO output and background work of the server mode running the lifecycle:
+#   emit(event, data, to)        emit on NAMESPACE to a client SID or room
+#   broadcast(session_id, output)  'pty-output' to every subscriber of a session
+#   close_room(room)             remove every client from a room on NAMESPACE
+#   spawn(func, *args)           run func(*args) in the background
+ServerIO = namedtuple('ServerIO', ['emit', 'broadcast', 'close_room', 'spawn'])
+
+
+def _run(cmd, cwd, timeout=None):
+    return subprocess.run(cmd, capture_output=True, text=True, cwd=cwd, timeout=timeout)
+
+
+def _set_status_if(scenario_meta_data, expected_statuses, new_status):
+    # Moves the session to new_status if its status is one of expected_statuses. Returns True if it did.
+    with STATUS_LOCK:
+        if scenario_meta_data.get("status") not in expected_statuses:
+            return False
+        scenario_meta_data["status"] = new_status
+        return True
+
+
+# --- File and AWS helpers ---
+
+def _write_main_tf(scenario_dir, tf_file_content):
+    os.makedirs(scenario_dir, exist_ok=True)
+    with open(os.path.join(scenario_dir, 'main.tf'), 'w') as file:
+        file.write(tf_file_content)
+
+
+def _read_instance_ip_file(scenario_dir):
+    ip_file_path = os.path.join(scenario_dir, 'scenario_chaos_ip.txt')
+    if not os.path.exists(ip_file_path):
+        return None
+    with open(ip_file_path, 'r') as f:
+        return f.readline().strip() or None
+
+
+def _read_pem_file(scenario_dir):
+    pem_files_on_disk = glob.glob(os.path.join(scenario_dir, "*-key.pem"))
+    if not pem_files_on_disk:
+        return None, None
+    with open(pem_files_on_disk[0], 'r') as f:
+        return f.read(), pem_files_on_disk[0]
+
+
+def _delete_key_pair(placement, key_name):
+    boto3_session_for(placement).client('ec2').delete_key_pair(KeyName=key_name)
+
+
+# --- Provisioning ---
+
+def _terraform_output_json(scenario_dir, output_name, log):
+    # Returns the parsed value of a terraform output, or None if missing/null/unparseable
+    output_result = _run(['terraform', 'output', '-json', output_name], scenario_dir, timeout=60)
+    stdout = output_result.stdout.strip()
+    if output_result.returncode != 0 or not stdout or stdout.lower() == "null":
+        return None
+    try:
+        parsed = json.loads(stdout)
+    except json.JSONDecodeError:
+        log.error(f"API: Failed to parse TF output '{output_name}': {stdout}")
+        return None
+    return parsed.get('value') if isinstance(parsed, dict) else parsed
+
+
+def _terraform_destroy(session_id, tf_dir, log, log_prefix, timeout):
+    """Runs terraform destroy in tf_dir, logging its output to the session log. Returns True on success."""
+    log.info(f"{log_prefix}: Running terraform destroy for {session_id} in {tf_dir}")
+    destroy_result = _run(TERRAFORM_DESTROY_CMD, tf_dir, timeout=timeout)
+    log_session_detail(session_id, 'terraform_destroy', 'Terraform destroy STDOUT', destroy_result.stdout)
+    if destroy_result.returncode == 0:
+        log.info(f"{log_prefix}: Terraform destroy successful for {session_id}.")
+        return True
+    log.error(f"{log_prefix}: Terraform destroy FAILED for {session_id}. Code: {destroy_result.returncode}. Output is in the session log.")
+    log_session_detail(session_id, 'terraform_destroy', 'Terraform destroy STDERR', destroy_result.stderr)
+    return False
+
+
+def _terraform_initialized(tf_dir):
+    # Apply only ever runs after a successful init, so no state and no .terraform means nothing to destroy
+    return os.path.exists(os.path.join(tf_dir, 'terraform.tfstate')) or os.path.exists(os.path.join(tf_dir, '.terraform'))
+
+
+def _destroy_after_failure(session_id, tf_dir, reason, log):
+    if tf_dir and os.path.exists(tf_dir):
+        log.info(f"API: Attempting destroy due to {reason}: {tf_dir}")
+        try:
+            _terraform_destroy(session_id, tf_dir, log, 'API', timeout=300)
+        except Exception as cleanup_e:
+            log.error(f"API: Error during cleanup attempt: {cleanup_e}")
+
+
+def _release_failed_placement(session_id, placement, log):
+    # A failed provisioning counts against the placement's recent failure rate and frees its quota slot
+    record_provisioning_outcome(placement, succeeded=False)
+    release_placement(session_id)
+    log.info(f"API: Released placement {placement_key(placement)} for failed session {session_id}.")
+
+
+def provision_scenario(data, placements_spec, quotas_spec, server_io, logger, client_gone=None):
+    """
+    POST /api/scenarios: provisions the requested scenario with terraform. Returns (response_body, http_status).
+    client_gone() optionally reports whether the HTTP client disconnected; that cancels the run like the cancel API.
+    """
+    if not data:
+        logger.error("API: No data provided in POST /scenarios request.")
+        return {'error': 'No data provided'}, 400
+
+    button_variable_repo_name = data.get('repo')
+    if not button_variable_repo_name:
+        logger.error("API: Missing 'repo' parameter in POST /scenarios request.")
+        return {'error': 'Missing required parameter: repo'}, 400
+
+    scenario_module_git_path = f"modules/{button_variable_repo_name}"
+    hash_str = hashlib.sha256(str(time.time()).encode()).hexdigest()[:5]
+    terraform_name_prefix_for_run = f'clw-{button_variable_repo_name}-{hash_str}'
+    session_id = terraform_name_prefix_for_run  # Use this as the unique session identifier
+    log = session_logger(logger, session_id, 'provision')  # Tags records with session_id/phase
+    log.info(f"API: Processing scenario request for repo: {button_variable_repo_name}, module path: //{scenario_module_git_path}")
+
+    # Pick a region/account with headroom before touching terraform; the reservation counts against its quota until cleanup
+    placement = reserve_placement(
+        session_id,
+        parse_placements(placements_spec),
+        ConfiguredQuotaSource(parse_quotas(quotas_spec)),
+        app_logger=log
+    )
+    if not placement:
+        close_session_log(session_id)
+        return {'error': 'No capacity available for new scenarios right now. Please try again later.'}, 503
+
+    # Lets POST /scenarios/<id>/cancel (by session ID or the client's clientRequestId) interrupt this run
+    register_provisioning(session_id, data.get('clientRequestId'))
+    scenario_specific_dir = os.path.join(BASE_WORK_DIR, f"{terraform_name_prefix_for_run}_scenario_dir")
+    try:
+        tf_file_content = BASE_TERRAFORM_TEMPLATE.format(
+            terraform_name_prefix=terraform_name_prefix_for_run,
+            scenario_module_git_path=scenario_module_git_path,
+            **terraform_provider_args(placement)
+        )
+        _write_main_tf(scenario_specific_dir, tf_file_content)
+        log.debug(f"API: Terraform main.tf generated in: {scenario_specific_dir}")
+        log_session_detail(session_id, 'provision', 'Generated main.tf', tf_file_content)
+
+        log.info(f"API: Running Terraform init in {scenario_specific_dir} (placement: {placement_key(placement)})")
+        init_process = run_terraform_cancellable(
+            session_id, TERRAFORM_INIT_CMD, scenario_specific_dir, timeout=600, client_gone=client_gone
+        )
+        log.info("API: Terraform init completed (output in session log).")
+        log_session_detail(session_id, 'terraform_init', 'Terraform init STDOUT', init_process.stdout)
+
+        log.info(f"API: Running Terraform apply in {scenario_specific_dir}")
+        apply_process = run_terraform_cancellable(
+            session_id, TERRAFORM_APPLY_CMD, scenario_specific_dir, timeout=900, client_gone=client_gone
+        )
+        log_session_detail(session_id, 'terraform_apply', 'Terraform apply STDOUT', apply_process.stdout)
+        log.info(f"API: Terraform apply completed for {terraform_name_prefix_for_run}.")
+
+        # --- Read IP ---
+        instance_ip = _read_instance_ip_file(scenario_specific_dir)
+        if instance_ip:
+            log.info(f"API: Read IP '{instance_ip}' from scenario_chaos_ip.txt")
+        else:
+            log.warning("API: Failed to read instance IP from scenario_chaos_ip.txt. Attempting TF output fallback.")
+            instance_ip = _terraform_output_json(scenario_specific_dir, 'scenario_instance_public_ip', log)
+            if not instance_ip:
+                log.error("API: Missing 'instance_public_ip' after all attempts.")
+                raise Exception('Missing "instance_public_ip": Failed to get from file and terraform output.')
+
+        # --- Read PEM key ---
+        private_key_pem_content, pem_file_path = _read_pem_file(scenario_specific_dir)
+        if private_key_pem_content:
+            log.info(f"API: Read PEM content from {pem_file_path}")
+        else:
+            log.warning("API: PEM file not found via glob. Trying TF output for 'private_key_pem'.")
+            private_key_pem_content = _terraform_output_json(scenario_specific_dir, 'private_key_pem', log)
+            if not private_key_pem_content:
+                log.error("API: Missing 'private_key_pem' after all attempts.")
+                raise Exception('Missing "private_key_pem": Failed to get from file and terraform output.')
+
+        # --- Get AWS Key Pair Name ---
+        aws_key_pair_name = None
+        output_key_name_result = _run(['terraform', 'output', '-raw', 'key_name'], scenario_specific_dir, timeout=60)
+        if output_key_name_result.returncode == 0 and output_key_name_result.stdout.strip():
+            aws_key_pair_name = output_key_name_result.stdout.strip()
+            log.info(f"API: Read AWS key_name '{aws_key_pair_name}' from terraform output.")
+        else:
+            log.warning(f"API: Could not retrieve 'key_name' from Terraform output. Stderr: {output_key_name_result.stderr}")
+
+        log.info(f"API: Final - Instance IP: {instance_ip}, AWS Key Pair Name: {aws_key_pair_name}, PEM File used: {pem_file_path}")
+        claim_provisioning(session_id, client_gone)  # Last chance to cancel: once registered, the session is torn down via the terminal
+
+        SCENARIO_SESSIONS[session_id] = {
+            "repo": button_variable_repo_name,
+            "status": "provisioned",
+            "terraform_dir": scenario_specific_dir,
+            "instance_ip": instance_ip,
+            "private_key_pem_content": private_key_pem_content,
+            "key_name_aws": aws_key_pair_name,
+            "terraform_name_prefix_for_run": terraform_name_prefix_for_run,
+            "placement": placement,
+            "client_request_id": data.get('clientRequestId')
+        }
+        record_provisioning_outcome(placement, succeeded=True)
+        record_output(session_id)  # Start the idle clock; a session nobody joins is suspended too
+
+        initial_end_time = initialize_session_timer(session_id, app_logger=log)
+        log.info(f"API: Scenario '{button_variable_repo_name}' (ID: {session_id}) provisioned. Timer initialized, ends at epoch {initial_end_time}.")
+        return {
+            'message': f'Scenario {button_variable_repo_name} provisioned! IP: {instance_ip}',
+            'sessionId': session_id,
+            'websocketPath': NAMESPACE,
+            'endTime': initial_end_time
+        }, 200
+
+    except ProvisioningCancelled as e:
+        # Not a placement failure: the quota slot was freed when the cancel was accepted; destroy in the background
+        release_placement(session_id)
+        log.info(f"API: Provisioning cancelled for {session_id} ({e}). Placement {placement_key(placement)} released, destroying in background.")
+        server_io.spawn(destroy_cancelled_scenario, session_id, scenario_specific_dir, logger)
+        return {'error': 'Scenario provisioning was cancelled', 'cancelled': True, 'sessionId': session_id}, 409
+    except subprocess.TimeoutExpired as e:
+        error_msg = f"Terraform command timed out: {' '.join(e.cmd)}"
+        log.error(error_msg)
+        _destroy_after_failure(session_id, scenario_specific_dir, "timeout", log)
+        _release_failed_placement(session_id, placement, log)
+        return {'error': error_msg, 'details': 'Terraform operation timed out.'}, 500
+    except subprocess.CalledProcessError as e:
+        error_msg = f"Terraform command '{' '.join(e.cmd)}' failed with code {e.returncode}."
+        log.error(f"{error_msg} Output is in the session log.")
+        log_session_detail(session_id, 'provision', 'Failed terraform STDOUT', e.stdout)
+        log_session_detail(session_id, 'provision', 'Failed terraform STDERR', e.stderr)
+        _destroy_after_failure(session_id, scenario_specific_dir, "failed TF command", log)
+        _release_failed_placement(session_id, placement, log)
+        return {'error': error_msg, 'details': e.stderr or e.stdout or "Terraform command failed."}, 500
+    except Exception as e:
+        error_msg = f"An unexpected error occurred in create_scenario: {str(e)}"
+        log.error(error_msg, exc_info=True)
+        _destroy_after_failure(session_id, scenario_specific_dir, "unexpected error", log)
+        _release_failed_placement(session_id, placement, log)
+        return {'error': error_msg, 'details': str(e)}, 500
+    finally:
+        finish_provisioning(session_id)
+        if session_id not in SCENARIO_SESSIONS:
+            # Failed or cancelled: no cleanup will close this log (a background destroy reopens and closes its own)
+            close_session_log(session_id)
+
+
+def destroy_cancelled_scenario(session_id, tf_dir, logger):
+    # Runs in the background so the cancelled request returns right away
+    log = session_logger(logger, session_id, 'cancel')
+    if tf_dir and os.path.exists(tf_dir) and not _terraform_initialized(tf_dir):
+        # Cancelled during (or before) init: nothing was applied, and destroy would fail without providers
+        log.info(f"API: Cancelled session {session_id} never got past terraform init, removing {tf_dir} without destroy.")
+        shutil.rmtree(tf_dir, ignore_errors=True)
+    elif tf_dir and os.path.exists(tf_dir):
+        try:
+            if _terraform_destroy(session_id, tf_dir, log, 'API', timeout=600):
+                shutil.rmtree(tf_dir, ignore_errors=True)
+            else:
+                log.error(f"API: Keeping {tf_dir} (and its state) so the leftovers of {session_id} can be destroyed by hand.")
+        except subprocess.TimeoutExpired:
+            log.error(f"API: Terraform destroy timed out for cancelled session {session_id} in {tf_dir}")
+        except Exception as e:
+            log.error(f"API: Error destroying cancelled session {session_id}: {e}", exc_info=True)
+    close_session_log(session_id)
+
+
+def _find_provisioned_session(session_or_request_id):
+    if session_or_request_id in SCENARIO_SESSIONS:
+        return session_or_request_id
+    for session_id, scenario_meta_data in list(SCENARIO_SESSIONS.items()):
+        if scenario_meta_data.get("client_request_id") == session_or_request_id:
+            return session_id
+    return None
+
+
+def cancel_provisioning(session_or_request_id, logger):
+    """POST /api/scenarios/<id>/cancel. Returns (response_body, http_status)."""
+    # Accepts the session ID or the clientRequestId sent with POST /scenarios (the client has no session ID until it returns)
+    logger.info(f"API: Request to cancel provisioning for: {session_or_request_id}")
+    session_id = request_cancel(session_or_request_id)
+    if not session_id and _find_provisioned_session(session_or_request_id):
+        # Too late: the run was claimed (see claim_provisioning) and is registered as a session
+        return {'error': 'Scenario is already provisioned; it is destroyed when its terminal disconnects'}, 409
+    if not session_id:
+        logger.warning(f"API: Cancel request for unknown or finished provisioning: {session_or_request_id}")
+        return {'error': 'No provisioning in progress for this ID'}, 404
+    logger.info(f"API: Cancellation requested for provisioning session {session_id}, placement released.")
+    return {'message': 'Cancellation requested', 'sessionId': session_id}, 202
+
+
+def extend_scenario_timer(session_id, logger):
+    """POST /api/scenarios/<session_id>/extend_timer. Returns (response_body, http_status)."""
+    logger.info(f"API: Request to extend timer for session: {session_id}")
+    if session_id not in SCENARIO_SESSIONS:
+        logger.warning(f"API: Extend timer request for non-existent session: {session_id}")
+        return {'error': 'Scenario session not found'}, 404
+
+    new_end_time = extend_session_timer(session_id, app_logger=logger)
+    if new_end_time:
+        logger.info(f"API: Timer for {session_id} extended. New end time (Epoch): {new_end_time}.")
+        return {
+            'message': 'Timer extended successfully',
+            'sessionId': session_id,
+            'newEndTime': new_end_time
+        }, 200
+    # This case might occur if the session was removed between the check and the extension
+    logger.error(f"API: Failed to extend timer for session {session_id} (extend_session_timer returned None).")
+    return {'error': 'Failed to extend timer. Session might no longer be valid.'}, 500
+
+
+def load_seed_sessions(seed_file_path, app_logger):
+    """
+    Registers pre-existing SSH hosts as scenario sessions, without running terraform.
+    The file maps session IDs to {"instance_ip", "private_key_pem_content" or "private_key_path", "ssh_username", "ssh_port"}.
+    Used by benchmarks/terminal_bench.py and for local development; seeded sessions survive client disconnects.
+    """
+    with open(seed_file_path, 'r') as f:
+        seed_sessions = json.load(f)
+    for session_id, seed in seed_sessions.items():
+        private_key_pem_content = seed.get("private_key_pem_content")
+        if not private_key_pem_content and seed.get("private_key_path"):
+            with open(os.path.expanduser(seed["private_key_path"]), 'r') as key_file:
+                private_key_pem_content = key_file.read()
+        SCENARIO_SESSIONS[session_id] = {
+            "repo": seed.get("repo", "seeded"),
+            "status": "provisioned",
+            "terraform_dir": None,
+            "instance_ip": seed["instance_ip"],
+            "private_key_pem_content": private_key_pem_content,
+            "ssh_username": seed.get("ssh_username", "ec2-user"),
+            "ssh_port": seed.get("ssh_port", 22),
+            "key_name_aws": None,
+            "terraform_name_prefix_for_run": session_id,
+            "seeded": True
+        }
+        initialize_session_timer(session_id, app_logger=app_logger)
+    app_logger.info(f"API: Loaded {len(seed_sessions)} seeded sessions from {seed_file_path}")
+    return list(seed_sessions)
+
+
+# --- Cleanup ---
+
+def cleanup_session(session_id, close_pty, server_io, logger):
+    """
+    Full teardown of a session: timer, PTY (close_pty(session_id, log) is the mode's SSH teardown),
+    subscribers, terraform resources, key pair, working directory and placement.
+    """
+    log = session_logger(logger, session_id, 'cleanup')  # Tags records with session_id/phase
+    log.info(f"Cleanup: Starting for scenario session: {session_id}")
+
+    if remove_session_timer(session_id, app_logger=log):
+        log.info(f"Cleanup: Timer removed for session {session_id}.")
+    close_pty(session_id, log)
+    drop_session(session_id)  # Participants and spectators stop receiving output for this session
+    server_io.close_room(session_id)
+    clear_activity(session_id)
+
+    scenario_meta_data = SCENARIO_SESSIONS.pop(session_id, None)
+    if scenario_meta_data:
+        tf_dir = scenario_meta_data.get("terraform_dir")
+        placement = scenario_meta_data.get("placement")
+        if tf_dir and os.path.exists(tf_dir):
+            try:
+                _terraform_destroy(session_id, tf_dir, log, 'Cleanup', timeout=600)
+
+                aws_key_name = scenario_meta_data.get("key_name_aws")
+                if aws_key_name:
+                    log.info(f"Cleanup: Attempting to delete AWS key pair: {aws_key_name} (placement: {placement_key(placement) if placement else 'default'})")
+                    try:
+                        _delete_key_pair(placement, aws_key_name)
+                        log.info(f"Cleanup: Successfully deleted AWS key pair: {aws_key_name}")
+                    except Exception as key_del_e:
+                        log.error(f"Cleanup: Failed to delete AWS key pair {aws_key_name}: {key_del_e}")
+                else:
+                    log.warning(f"Cleanup: No 'key_name_aws' in metadata for {session_id}, skipping key deletion.")
+
+                shutil.rmtree(tf_dir, ignore_errors=True)
+                log.info(f"Cleanup: Removed directory {tf_dir}")
+            except subprocess.TimeoutExpired:
+                log.error(f"Cleanup: Terraform destroy timed out for {session_id} in {tf_dir}")
+            except Exception as e:
+                log.error(f"Cleanup: Error during terraform destroy or directory cleanup for {session_id} in {tf_dir}: {e}", exc_info=True)
+        else:
+            log.warning(f"Cleanup: Terraform directory '{tf_dir}' not found or not specified for cleanup of {session_id}")
+    else:
+        log.warning(f"Cleanup: No scenario metadata (SCENARIO_SESSIONS) found for {session_id} (already cleaned or never existed).")
+
+    # Free the session's quota slot in its region/account for the next provisioning request
+    if release_placement(session_id):
+        log.info(f"Cleanup: Placement released for session {session_id}.")
+    log.info(f"Cleanup: Full cleanup process finished for scenario session {session_id}")
+    close_session_log(session_id)
+
+
+# --- Idle suspend / resume ---
+
+def suspend_session(session_id, endpoint_url, close_ssh, server_io, logger):
+    """
+    Stops an idle session's instances, closing SSH (close_ssh(session_id, log)) and pausing its timer.
+    Returns True if suspended. instance_ids / ssh_instance_id already in the session metadata are used as-is.
+    """
+    log = session_logger(logger, session_id, 'suspend')
+    scenario_meta_data = SCENARIO_SESSIONS.get(session_id)
+    if not scenario_meta_data or scenario_meta_data.get("seeded"):
+        return False
+    if not _set_status_if(scenario_meta_data, ("provisioned",), "suspending"):
+        return False
+    log.info(f"Idle: Suspending idle scenario session {session_id}")
+
+    try:
+        ec2_client = ec2_client_for(scenario_meta_data.get("placement"), endpoint_url)
+        if not scenario_meta_data.get("instance_ids"):
+            scenario_meta_data["instance_ids"] = get_scenario_instance_ids(scenario_meta_data["terraform_dir"])
+        if not scenario_meta_data.get("ssh_instance_id") and scenario_meta_data["instance_ids"]:
+            scenario_meta_data["ssh_instance_id"] = find_instance_by_public_ip(
+                ec2_client, scenario_meta_data["instance_ids"], scenario_meta_data.get("instance_ip")
+            )
+        if not scenario_meta_data["instance_ids"] or not scenario_meta_data.get("ssh_instance_id"):
+            raise Exception("Could not identify the scenario's instances")
+    except Exception as e:
+        log.error(f"Idle: Not suspending {session_id}, instance lookup failed: {e}")
+        scenario_meta_data["status"] = "provisioned"
+        record_output(session_id)  # Restart the idle clock instead of retrying every check
+        return False
+
+    try:
+        # Only requests the stop, so a failure here leaves the participant's SSH and timer untouched
+        stop_instances(ec2_client, scenario_meta_data["instance_ids"], log)
+    except Exception as e:
+        log.error(f"Idle: Failed to stop instances for {session_id}: {e}", exc_info=True)
+        scenario_meta_data["status"] = "provisioned"
+        record_output(session_id)
+        return False
+
+    server_io.broadcast(session_id, "\r\n[Session suspended after inactivity. Press any key to resume it.]\r\n")
+    close_ssh(session_id, log)
+    remaining_seconds = pause_session_timer(session_id, app_logger=log)
+    server_io.emit('timer-paused', {'sessionId': session_id, 'remainingSeconds': remaining_seconds}, session_id)
+
+    scenario_meta_data["status"] = "suspended"
+    scenario_meta_data["suspended_at"] = time.time()
+    clear_activity(session_id)  # Nothing to track until the session is resumed
+    log.info(f"Idle: Scenario session {session_id} suspended.")
+    return True
+
+
+def resume_session(session_id, client_sid, endpoint_url, server_io, logger, ssh_ready=wait_for_ssh_port):
+    """
+    Starts a suspended session's instances again and waits until ssh_ready(host) reports SSH reachable.
+    Returns True when the session is ready for an SSH connection.
+    """
+    log = session_logger(logger, session_id, 'resume')
+    scenario_meta_data = SCENARIO_SESSIONS.get(session_id)
+    if not scenario_meta_data:
+        return False
+
+    # The idle monitor may still be suspending, or another client may already be resuming: let it settle
+    waited = 0
+    while scenario_meta_data.get("status") in ("suspending", "resuming") and waited < RESUME_WAIT_SECONDS:
+        time.sleep(2)
+        waited += 2
+    if scenario_meta_data.get("status") == "provisioned":
+        return True
+    if not _set_status_if(scenario_meta_data, ("suspended",), "resuming"):
+        server_io.emit('pty-output', {"output": "\r\nError: Session is busy, please reconnect in a moment.\r\n"}, client_sid)
+        return False
+
+    server_io.emit('pty-output', {"output": "\r\nSession was suspended after inactivity. Starting instances, this can take a minute or two...\r\n"}, client_sid)
+    try:
+        ec2_client = ec2_client_for(scenario_meta_data.get("placement"), endpoint_url)
+        new_instance_ip = start_instances(
+            ec2_client, scenario_meta_data["instance_ids"], scenario_meta_data["ssh_instance_id"], log
+        )
+        if new_instance_ip and new_instance_ip != scenario_meta_data.get("instance_ip"):
+            log.info(f"Idle: Instance IP for {session_id} changed from {scenario_meta_data.get('instance_ip')} to {new_instance_ip}")
+            scenario_meta_data["instance_ip"] = new_instance_ip
+        if not ssh_ready(scenario_meta_data["instance_ip"]):
+            raise Exception(f"SSH on {scenario_meta_data['instance_ip']} did not become reachable")
+    except Exception as e:
+        log.error(f"Idle: Failed to resume scenario session {session_id}: {e}", exc_info=True)
+        scenario_meta_data["status"] = "suspended"
+        server_io.emit('pty-output', {"output": f"\r\nError resuming session: {e}\r\n"}, client_sid)
+        return False
+
+    scenario_meta_data["status"] = "provisioned"
+    scenario_meta_data.pop("suspended_at", None)
+    record_output(session_id)
+    new_end_time = resume_session_timer(session_id, app_logger=log)
+    server_io.emit('timer-update', {'sessionId': session_id, 'endTime': new_end_time}, session_id)
+    log.info(f"Idle: Scenario session {session_id} resumed.")
+    return True
+
+
+def suspend_idle_sessions(idle_seconds, endpoint_url, close_ssh, server_io, logger):
+    # One pass of the idle monitor; each mode calls it every IDLE_CHECK_INTERVAL_SECONDS
+    for session_id in find_idle_sessions(idle_seconds):
+        try:
+            suspend_session(session_id, endpoint_url, close_ssh, server_io, logger)
+        except Exception as e:
+            logger.error(f"Idle: Unexpected error suspending {session_id}: {e}", exc_info=True)
+
+
+# --- /terminal_ws decisions shared by both namespaces ---
+
+def is_instructor(token, instructor_token):
+    """True if token matches the configured INSTRUCTOR_TOKEN. Spectating is disabled while none is configured."""
+    if not instructor_token or not isinstance(token, str):
+        return False
+    return hmac.compare_digest(token.encode(), instructor_token.encode())
+
+
+def check_join(session_id, role, token=None, instructor_token=None):
+    """
+    Validates a join_scenario request. Returns (error_message, disconnect_client); error_message is None if valid.
+    Spectators need the instructor token, checked before the session lookup so it doesn't reveal which IDs exist.
+    """
+    if role not in ROLES:
+        return f"\r\nError: Invalid role: {role}\r\n", False
+    if role == ROLE_SPECTATOR and not is_instructor(token, instructor_token):
+        return "\r\nError: Spectating requires a valid instructor token.\r\n", True
+    if not session_id or session_id not in SCENARIO_SESSIONS:
+        return f"\r\nError: Invalid or unknown scenario session ID: {session_id}\r\n", True
+    return None, False
+
+
+def last_client_gone_action(session_id):
+    """
+    What to do when the last participant of a session disconnects: 'close_ssh' for seeded sessions
+    (no terraform resources, they stay registered), 'cleanup' for provisioned ones, None if already gone.
+    """
+    scenario_meta_data = SCENARIO_SESSIONS.get(session_id)
+    if not scenario_meta_data:
+        return None
+    return "close_ssh" if scenario_meta_data.get("seeded") else "cleanup"
+
+
+def input_while_suspended_action(session_id):
+    """
+    What a participant's terminal input does while the session isn't running: 'resume' for a suspended session
+    (the keystroke only wakes it), 'busy' while it is being suspended or resumed, None when input can go to SSH.
+    """
+    status = SCENARIO_SESSIONS.get(session_id, {}).get("status")
+    if status == "suspended":
+        return "resume"
+    if status in ("suspending", "resuming"):
+        return "busy"
+    return None
+
+
+def watch_sessions(client_sid, session_ids, token=None, instructor_token=None):
+    """
+    watch_sessions event: subscribes client_sid read-only to several sessions (instructor token required).
+    Returns (ack_payload, session_ids_to_join); the caller puts the socket in those sessions' rooms.
+    The ack doesn't say which of the requested IDs exist, so it can't be used to enumerate sessions.
+    """
+    # Dashboard subscription: one socket receives read-only output of many sessions, each frame tagged with sessionId
+    if not is_instructor(token, instructor_token):
+        return {"status": "error", "message": "Watching sessions requires a valid instructor token"}, []
+    if not isinstance(session_ids, list) or not all(isinstance(session_id, str) for session_id in session_ids):
+        return {"status": "error", "message": "sessionIds must be a list of session IDs"}, []
+    if len(spectated_sessions(client_sid)) + len(session_ids) > MAX_WATCHED_SESSIONS:
+        return {"status": "error", "message": f"At most {MAX_WATCHED_SESSIONS} sessions can be watched per connection"}, []
+
+    joined = []
+    for session_id in session_ids:
+        if session_id in SCENARIO_SESSIONS:
+            subscribe(session_id, client_sid, ROLE_SPECTATOR)
+            joined.append(session_id)
+    return {"status": "ok", "requested": len(session_ids)}, joined
+
+
+def unwatch_sessions(client_sid, session_ids):
+    """
+    unwatch_sessions event: no list means stop watching everything. Only spectator subscriptions are removed.
+    Returns the ack payload; its "unwatched" list holds the session rooms the caller should make the socket leave.
+    """
+    if session_ids is None:
+        session_ids = spectated_sessions(client_sid)
+    elif not isinstance(session_ids, list):
+        return {"status": "error", "message": "sessionIds must be a list of session IDs"}
+    removed = [s_id for s_id in session_ids if get_role(s_id, client_sid) == ROLE_SPECTATOR and unsubscribe(s_id, client_sid)]
+    return {"status": "ok", "unwatched": removed}
+# --- END server/app/lifecycle.py ---
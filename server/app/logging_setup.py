@@ -0,0 +1,300 @@
+# --- START server/app/logging_setup.py ---
+import os
+import re
+import json
+import time
+import logging
+import importlib
+import threading
+import logging.handlers
+
+# Logging pipeline shared by both server modes:
+#   request / reader code --QueueHandler--> queue --QueueListener thread--> console (JSON) + per-session files
+# Callers only pay for enqueueing a record; formatting and I/O happen on the listener thread.
+# Records carry session_id / phase via `extra` (see session_logger). Bulky terraform / SSH output goes through
+# log_session_detail and only lands in the session's rotating file, never on the console.
+
+SESSION_DETAIL_LOGGER_NAME = 'chaoslab.session'
+SESSION_LOG_PRUNE_INTERVAL_SECONDS = 60 * 60  # How often closing a session log also deletes expired session logs
+BUCKET_EXPIRY_INTERVAL_SECONDS = 60  # How often RateLimitFilter drops idle buckets
+
+_LISTENER = None
+_SESSION_FILE_HANDLER = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg plus session_id / phase when present."""
+    def format(self, record):
+        entry = {
+            "ts": time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for field in ("session_id", "phase"):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+RATE_LIMITED = {"rate_limited": True}  # extra= for hot-path log lines (per keystroke / resize / packet)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per call site (logger + file + line) and session, so a chatty hot-path log line can't flood
+    the pipeline. Only applies to records marked with extra=RATE_LIMITED (below ERROR) and to records below
+    WARNING from the noisy library loggers in limited_loggers (e.g. 'engineio', 'aiohttp.access').
+    The next record let through reports how many were dropped. A session's buckets are dropped when its log is
+    closed (close_session_log), other idle buckets once they have refilled.
+    """
+    def __init__(self, per_second, limited_loggers=(), burst=None):
+        super().__init__()
+        self.per_second = per_second
+        self.limited_loggers = tuple(limited_loggers)
+        self.burst = burst if burst is not None else max(per_second, 1)
+        self._buckets = {}  # Stores call_site: [tokens, last_refill_ts, suppressed_count]
+        self._lock = threading.Lock()
+        self._last_expiry = time.monotonic()
+
+    def _is_limited(self, record):
+        if getattr(record, "rate_limited", False):
+            return record.levelno < logging.ERROR
+        return record.levelno < logging.WARNING and any(
+            record.name == name or record.name.startswith(name + '.') for name in self.limited_loggers
+        )
+
+    def _forget_session(self, session_id):
+        with self._lock:
+            for call_site in [call_site for call_site in self._buckets if call_site[3] == session_id]:
+                del self._buckets[call_site]
+
+    def _expire_idle_buckets(self, now):
+        # A bucket that has refilled and dropped nothing since behaves exactly like a new one
+        refill_seconds = self.burst / self.per_second
+        for call_site, bucket in list(self._buckets.items()):
+            if not bucket[2] and now - bucket[1] >= refill_seconds:
+                del self._buckets[call_site]
+        self._last_expiry = now
+
+    def filter(self, record):
+        if getattr(record, "close_session_log", False):
+            self._forget_session(getattr(record, "session_id", None))
+            return True
+        if not self.per_second or not self._is_limited(record):
+            return True
+        call_site = (record.name, record.pathname, record.lineno, getattr(record, "session_id", None))
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_expiry >= BUCKET_EXPIRY_INTERVAL_SECONDS:
+                self._expire_idle_buckets(now)
+            bucket = self._buckets.setdefault(call_site, [self.burst, now, 0])
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.per_second)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            record.suppressed, bucket[2] = bucket[2], 0
+            return True
+
+
+class ConsoleFilter(logging.Filter):
+    # Session detail records (terraform stdout etc.) belong in the session file only
+    def filter(self, record):
+        return not getattr(record, "session_detail", False)
+
+
+def safe_session_filename(session_id):
+    return re.sub(r'[^A-Za-z0-9._-]', '_', session_id) + '.log'
+
+
+def _unpatched(module_name):
+    # Under eventlet monkey-patching threading and queue are green. Everything the listener (a real OS thread)
+    # shares with greenlets - the queue, handler locks - must use the original modules: a green primitive
+    # waited on across OS threads fails with "greenlet.error: Cannot switch to a different thread".
+    try:
+        import eventlet.patcher
+        if eventlet.patcher.is_monkey_patched('thread'):
+            return eventlet.patcher.original(module_name)
+    except ImportError:
+        pass
+    return importlib.import_module(module_name)
+
+
+def _real_threading():
+    return _unpatched('threading')
+
+
+class _RealLockMixin(object):
+    def createLock(self):
+        self.lock = _real_threading().RLock()
+
+
+class _SessionRotatingFileHandler(_RealLockMixin, logging.handlers.RotatingFileHandler):
+    pass
+
+
+class SessionFileHandler(_RealLockMixin, logging.Handler):
+    """
+    Writes records tagged with a session_id to <log_dir>/<session_id>.log, rotating by size.
+    Runs on the listener thread; close_session_log() is queued like a record, so per-session
+    files are only ever opened, written and closed there. Files not written to for retention_seconds
+    (0 keeps them forever) are deleted at startup and, at most hourly, when a session log is closed.
+    """
+    def __init__(self, log_dir, max_bytes, backup_count, retention_seconds=0):
+        super().__init__()
+        self.log_dir = log_dir
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.retention_seconds = retention_seconds
+        self._handlers = {}  # Stores session_id: _SessionRotatingFileHandler
+        self._handlers_lock = _real_threading().Lock()  # Only contended by close() at shutdown
+        self._last_prune = 0
+        os.makedirs(log_dir, exist_ok=True)
+        self.prune_expired()
+
+    def _handler_for(self, session_id):
+        with self._handlers_lock:
+            handler = self._handlers.get(session_id)
+            if handler is None:
+                handler = _SessionRotatingFileHandler(
+                    os.path.join(self.log_dir, safe_session_filename(session_id)),
+                    maxBytes=self.max_bytes, backupCount=self.backup_count, delay=True
+                )
+                handler.setFormatter(self.formatter)
+                self._handlers[session_id] = handler
+            return handler
+
+    def emit(self, record):
+        session_id = getattr(record, "session_id", None)
+        if not session_id:
+            return
+        self._handler_for(session_id).handle(record)
+        if getattr(record, "close_session_log", False):
+            self.close_session(session_id)
+
+    def close_session(self, session_id):
+        with self._handlers_lock:
+            handler = self._handlers.pop(session_id, None)
+        if handler:
+            handler.close()
+        if time.time() - self._last_prune >= SESSION_LOG_PRUNE_INTERVAL_SECONDS:
+            self.prune_expired()
+
+    def prune_expired(self):
+        """Deletes session log files (and their rotated backups) older than retention_seconds, except open ones."""
+        self._last_prune = time.time()
+        if not self.retention_seconds:
+            return
+        cutoff = self._last_prune - self.retention_seconds
+        with self._handlers_lock:
+            open_files = {safe_session_filename(session_id) for session_id in self._handlers}
+        for file_name in os.listdir(self.log_dir):
+            match = re.match(r'^(.+\.log)(\.\d+)?$', file_name)
+            if not match or match.group(1) in open_files:
+                continue
+            file_path = os.path.join(self.log_dir, file_name)
+            try:
+                if os.path.getmtime(file_path) < cutoff:
+                    os.remove(file_path)
+            except OSError:
+                pass  # Removed concurrently, or not ours to delete
+
+    def close(self):
+        with self._handlers_lock:
+            handlers, self._handlers = list(self._handlers.values()), {}
+        for handler in handlers:
+            handler.close()
+        super().close()
+
+
+class _ConsoleHandler(_RealLockMixin, logging.StreamHandler):
+    pass
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def start(self):
+        # Under eventlet threading.Thread is a greenlet; the listener blocks on the queue,
+        # so it has to run in a real OS thread or it would stall the hub
+        self._thread = _real_threading().Thread(target=self._monitor, daemon=True)
+        self._thread.start()
+
+
+def configure_logging(config):
+    """
+    Installs the queue-based pipeline on the root logger. Safe to call more than once
+    (e.g. under the Flask reloader); later calls are no-ops.
+    """
+    global _LISTENER, _SESSION_FILE_HANDLER
+    if _LISTENER:
+        return _LISTENER
+
+    formatter = JsonFormatter()
+    console_handler = _ConsoleHandler()
+    console_handler.setFormatter(formatter)
+    console_handler.addFilter(ConsoleFilter())
+
+    _SESSION_FILE_HANDLER = SessionFileHandler(
+        config.SESSION_LOG_DIR, config.SESSION_LOG_MAX_BYTES, config.SESSION_LOG_BACKUP_COUNT,
+        retention_seconds=config.SESSION_LOG_RETENTION_DAYS * 24 * 60 * 60
+    )
+    _SESSION_FILE_HANDLER.setFormatter(formatter)
+
+    log_queue = _unpatched('queue').SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter(
+        config.LOG_RATE_LIMIT_PER_SECOND, [name.strip() for name in config.LOG_RATE_LIMITED_LOGGERS.split(',') if name.strip()]
+    ))
+
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(queue_handler)
+    root_logger.setLevel(config.LOG_LEVEL)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)  # Per-request access lines are not needed at INFO
+    logging.getLogger(SESSION_DETAIL_LOGGER_NAME).setLevel(logging.DEBUG)  # Detail always reaches the session file
+
+    _LISTENER = _QueueListener(log_queue, console_handler, _SESSION_FILE_HANDLER, respect_handler_level=True)
+    _LISTENER.start()
+    return _LISTENER
+
+
+def session_logger(logger, session_id, phase):
+    """LoggerAdapter that tags every record with session_id and phase."""
+    return logging.LoggerAdapter(logger, {"session_id": session_id, "phase": phase})
+
+
+def log_session_detail(session_id, phase, title, text):
+    """Logs bulky output (terraform stdout, SSH diagnostics) to the session's log file only."""
+    if not text:
+        return
+    logging.getLogger(SESSION_DETAIL_LOGGER_NAME).info(
+        f"{title}:\n{text}", extra={"session_id": session_id, "phase": phase, "session_detail": True}
+    )
+
+
+def close_session_log(session_id):
+    """Closes the session's log file handle (the file itself is kept for the logs endpoint)."""
+    # Goes through the queue like any record, so the file is closed after the session's last lines are written
+    logging.getLogger(SESSION_DETAIL_LOGGER_NAME).info(
+        "Session log closed", extra={"session_id": session_id, "session_detail": True, "close_session_log": True}
+    )
+
+
+def read_session_log(log_dir, session_id, tail_lines=None):
+    """Returns the session's current log file content (optionally only the last tail_lines lines), or None."""
+    log_path = os.path.join(log_dir, safe_session_filename(session_id))
+    if not os.path.exists(log_path):
+        return None
+    with open(log_path, 'r', errors='replace') as f:
+        lines = f.readlines()
+    if tail_lines:
+        lines = lines[-tail_lines:]
+    return ''.join(lines)
+# --- END server/app/logging_setup.py ---
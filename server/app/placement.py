@@ -0,0 +1,169 @@
+# --- START server/app/placement.py ---
+import time
+import threading
+from collections import deque
+import boto3
+
+# Chooses the AWS region (and optionally the named profile / account) a scenario is provisioned into.
+# A placement is a plain dict: {"region": "us-east-1", "profile": None}
+# It is recorded in SCENARIO_SESSIONS[session_id]["placement"] and rendered into main.tf, so
+# terraform destroy (and anything else re-running terraform in the scenario dir) hits the same account/region.
+
+PLACEMENTS = {}  # Stores session_id: placement dict, for sessions being provisioned or running
+PLACEMENT_OUTCOMES = {}  # Stores placement_key: deque of (unix_timestamp, succeeded)
+PLACEMENTS_LOCK = threading.Lock()  # Lock for thread-safe access to PLACEMENTS and PLACEMENT_OUTCOMES
+
+DEFAULT_REGION = "us-east-1"
+FAILURE_WINDOW_SECONDS = 30 * 60  # Only provisioning outcomes newer than this count towards the failure rate
+MAX_OUTCOMES_PER_PLACEMENT = 50
+FAILURE_RATE_WEIGHT = 2.0  # How strongly a recent failure rate outweighs current utilization when scoring
+UNLIMITED_QUOTA_SCALE = 20  # Placements without a quota are scored as if they had this many slots, so load still spreads
+
+
+def placement_key(placement):
+    """Returns a stable string key for a placement, e.g. 'us-east-1' or 'us-west-2:training'."""
+    if placement.get("profile"):
+        return f"{placement['region']}:{placement['profile']}"
+    return placement["region"]
+
+
+def parse_placements(spec):
+    """
+    Parses a comma separated placement spec into a list of placement dicts.
+    Each entry is 'region' or 'region:profile', e.g. 'us-east-1,us-west-2:training'.
+    Order matters: earlier entries win ties.
+    """
+    placements = []
+    for entry in (spec or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        region, _, profile = entry.partition(":")
+        placements.append({"region": region.strip(), "profile": profile.strip() or None})
+    if not placements:
+        placements.append({"region": DEFAULT_REGION, "profile": None})
+    return placements
+
+
+def parse_quotas(spec):
+    """
+    Parses a comma separated quota spec into {placement_key: max_sessions},
+    e.g. 'us-east-1=20,us-west-2:training=10'. Malformed entries are ignored.
+    """
+    quotas = {}
+    for entry in (spec or "").split(","):
+        key, sep, value = entry.partition("=")
+        if not sep:
+            continue
+        try:
+            quotas[key.strip()] = int(value.strip())
+        except ValueError:
+            continue
+    return quotas
+
+
+class ConfiguredQuotaSource(object):
+    """
+    Quota source backed by static configuration. Any object with a get_quota(placement) method
+    returning an int (max concurrent sessions) or None (no limit) can be used instead, e.g. a
+    fake in tests or one that reads EC2 service quotas.
+    """
+    def __init__(self, quotas, default_quota=None):
+        self.quotas = quotas
+        self.default_quota = default_quota
+
+    def get_quota(self, placement):
+        return self.quotas.get(placement_key(placement), self.default_quota)
+
+
+def choose_placement(candidates, session_counts, quota_source, failure_rates):
+    """
+    Picks the best placement from candidates, or None if every candidate is at its quota.
+    session_counts and failure_rates are keyed by placement_key. Lower score wins:
+    score = utilization + FAILURE_RATE_WEIGHT * recent failure rate, where utilization is sessions / quota
+    (sessions / UNLIMITED_QUOTA_SCALE for placements without a quota, so their session counts still count).
+    """
+    best = None
+    best_score = None
+    for placement in candidates:
+        key = placement_key(placement)
+        count = session_counts.get(key, 0)
+        quota = quota_source.get_quota(placement)
+        if quota is not None and count >= quota:
+            continue
+        utilization = count / (quota if quota else UNLIMITED_QUOTA_SCALE)
+        score = utilization + FAILURE_RATE_WEIGHT * failure_rates.get(key, 0.0)
+        if best_score is None or score < best_score:
+            best, best_score = placement, score
+    return best
+
+
+def _session_counts_locked():
+    counts = {}
+    for placement in PLACEMENTS.values():
+        key = placement_key(placement)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def _failure_rates_locked(now):
+    rates = {}
+    for key, outcomes in PLACEMENT_OUTCOMES.items():
+        recent = [succeeded for ts, succeeded in outcomes if now - ts <= FAILURE_WINDOW_SECONDS]
+        if recent:
+            rates[key] = recent.count(False) / len(recent)
+    return rates
+
+
+def reserve_placement(session_id, candidates, quota_source, app_logger=None):
+    """
+    Chooses a placement for session_id and records it so it counts against the quota
+    until release_placement is called. Returns the placement dict, or None if no capacity is left.
+    """
+    with PLACEMENTS_LOCK:
+        placement = choose_placement(
+            candidates, _session_counts_locked(), quota_source, _failure_rates_locked(time.time())
+        )
+        if not placement:
+            if app_logger:
+                app_logger.warning(f"Placement: No capacity left for session {session_id} in any of {[placement_key(c) for c in candidates]}.")
+            return None
+        PLACEMENTS[session_id] = dict(placement)
+        if app_logger:
+            app_logger.info(f"Placement: Session {session_id} placed in {placement_key(placement)}.")
+        return PLACEMENTS[session_id]
+
+
+def release_placement(session_id):
+    """Releases the placement held by session_id. Returns the released placement or None."""
+    with PLACEMENTS_LOCK:
+        return PLACEMENTS.pop(session_id, None)
+
+
+def get_placement(session_id):
+    with PLACEMENTS_LOCK:
+        return PLACEMENTS.get(session_id)
+
+
+def record_provisioning_outcome(placement, succeeded):
+    """Records a provisioning success/failure for a placement, feeding its recent failure rate."""
+    with PLACEMENTS_LOCK:
+        outcomes = PLACEMENT_OUTCOMES.setdefault(placement_key(placement), deque(maxlen=MAX_OUTCOMES_PER_PLACEMENT))
+        outcomes.append((time.time(), succeeded))
+
+
+def terraform_provider_args(placement):
+    """Returns the template arguments for the aws provider block of BASE_TERRAFORM_TEMPLATE."""
+    profile = placement.get("profile")
+    return {
+        "aws_region": placement["region"],
+        "aws_profile_line": f'profile = "{profile}"' if profile else "",
+    }
+
+
+def boto3_session_for(placement):
+    """Returns a boto3 Session for the placement's region/profile (default credentials if placement is None)."""
+    if not placement:
+        return boto3.Session()
+    return boto3.Session(region_name=placement.get("region"), profile_name=placement.get("profile"))
+# --- END server/app/placement.py ---
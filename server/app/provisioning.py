@@ -0,0 +1,149 @@
+# --- START server/app/provisioning.py ---
+import time
+import signal
+import threading
+import subprocess
+from app.placement import release_placement
+
+# Tracks in-flight create_scenario runs so they can be cancelled while terraform is still running.
+# A cancel sends SIGINT to the running terraform process: terraform stops starting new operations, waits for the
+# in-progress ones and writes its state, so the subsequent destroy sees everything that was created.
+# An accepted cancel releases the session's placement right away; the destroy doesn't hold its quota slot.
+
+PROVISIONING = {}  # Stores session_id: {"client_request_id", "cancelled": threading.Event, "process", "started_at"}
+PROVISIONING_LOCK = threading.Lock()  # Lock for thread-safe access to PROVISIONING
+
+CANCEL_POLL_SECONDS = 1
+CANCEL_GRACE_SECONDS = 5 * 60  # How long terraform gets to reach a consistent state after SIGINT before it is killed
+
+
+class ProvisioningCancelled(Exception):
+    """Raised inside create_scenario when the run was cancelled (API call or client gone); the message is the reason."""
+
+
+def register_provisioning(session_id, client_request_id=None):
+    with PROVISIONING_LOCK:
+        PROVISIONING[session_id] = {
+            "client_request_id": client_request_id,
+            "cancelled": threading.Event(),
+            "process": None,
+            "started_at": time.time(),
+        }
+
+
+def finish_provisioning(session_id):
+    with PROVISIONING_LOCK:
+        return PROVISIONING.pop(session_id, None)
+
+
+def claim_provisioning(session_id, client_gone=None):
+    """
+    Ends a successful run's cancellable phase: raises ProvisioningCancelled if it was cancelled, otherwise removes it
+    from PROVISIONING so later cancel requests find nothing to cancel. The check and the removal happen under one lock.
+    """
+    reason = "client disconnected" if client_gone and client_gone() else None
+    if reason:
+        request_cancel(session_id)
+    with PROVISIONING_LOCK:
+        entry = PROVISIONING.get(session_id)
+        if entry and entry["cancelled"].is_set():
+            raise ProvisioningCancelled(reason or "cancel requested")
+        PROVISIONING.pop(session_id, None)
+
+
+def find_provisioning_session(session_or_request_id):
+    """Resolves a session ID or a client-supplied clientRequestId to the provisioning session ID, or None."""
+    with PROVISIONING_LOCK:
+        if session_or_request_id in PROVISIONING:
+            return session_or_request_id
+        for session_id, entry in PROVISIONING.items():
+            if entry["client_request_id"] and entry["client_request_id"] == session_or_request_id:
+                return session_id
+        return None
+
+
+def request_cancel(session_or_request_id):
+    """
+    Flags an in-flight provisioning run as cancelled and releases its placement.
+    Returns its session ID, or None if nothing was running (or the run was already claimed).
+    """
+    session_id = find_provisioning_session(session_or_request_id)
+    if not session_id:
+        return None
+    with PROVISIONING_LOCK:
+        entry = PROVISIONING.get(session_id)
+        if not entry:
+            return None
+        first_cancel = not entry["cancelled"].is_set()
+        entry["cancelled"].set()
+    if first_cancel:
+        release_placement(session_id)  # The run can't be claimed any more, so its quota slot is free now
+    return session_id
+
+
+def is_cancelled(session_id):
+    with PROVISIONING_LOCK:
+        entry = PROVISIONING.get(session_id)
+        return bool(entry and entry["cancelled"].is_set())
+
+
+def cancel_reason(session_id, client_gone=None):
+    """Returns why session_id's run should stop ('client disconnected' / 'cancel requested'), or None."""
+    if client_gone and client_gone():
+        request_cancel(session_id)
+        return "client disconnected"
+    if is_cancelled(session_id):
+        return "cancel requested"
+    return None
+
+
+def set_provisioning_process(session_id, process):
+    with PROVISIONING_LOCK:
+        if session_id in PROVISIONING:
+            PROVISIONING[session_id]["process"] = process
+
+
+def run_terraform_cancellable(session_id, cmd, cwd, timeout, client_gone=None):
+    """
+    subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, check=True) that can be cancelled.
+    Every CANCEL_POLL_SECONDS it checks the session's cancel flag and the optional client_gone() callable;
+    on cancel terraform gets SIGINT and up to CANCEL_GRACE_SECONDS to exit cleanly, then ProvisioningCancelled
+    (with the reason as its message) is raised. Raises subprocess.TimeoutExpired / CalledProcessError like subprocess.run.
+    """
+    process = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    set_provisioning_process(session_id, process)
+    deadline = time.time() + timeout
+    try:
+        while True:
+            try:
+                stdout, stderr = process.communicate(timeout=CANCEL_POLL_SECONDS)
+                break
+            except subprocess.TimeoutExpired:
+                pass  # Still running; retrying communicate() doesn't lose output
+
+            reason = cancel_reason(session_id, client_gone)
+            if reason:
+                process.send_signal(signal.SIGINT)
+                try:
+                    process.communicate(timeout=CANCEL_GRACE_SECONDS)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.communicate()
+                    reason += f", terraform killed after {CANCEL_GRACE_SECONDS}s"
+                raise ProvisioningCancelled(reason)
+
+            if time.time() > deadline:
+                process.kill()
+                process.communicate()
+                raise subprocess.TimeoutExpired(cmd, timeout)
+    finally:
+        if process.poll() is None:
+            # Interrupted some other way (greenlet killed, server shutting down): don't leave terraform orphaned
+            process.kill()
+            process.wait()
+        set_provisioning_process(session_id, None)
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+# --- END server/app/provisioning.py ---
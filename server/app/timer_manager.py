@@ -4,6 +4,7 @@ import threading
 from flask import current_app # For logging if called within a request context or app context
 
 SCENARIO_TIMERS = {}  # Stores session_id: float_unix_timestamp_of_expiry
+PAUSED_TIMERS = {}  # Stores session_id: float_seconds_remaining while the session is suspended
 TIMERS_LOCK = threading.Lock() # Lock for thread-safe access to SCENARIO_TIMERS
 
 DEFAULT_DURATION_SECONDS = 30 * 60  # 30 minutes
@@ -38,6 +39,13 @@ def extend_timer(session_id, app_logger=None):
     """
     logger = app_logger if app_logger else (current_app.logger if current_app else None)
     with TIMERS_LOCK:
+        if session_id in PAUSED_TIMERS:
+            # Suspended session: extend the remaining time, the clock starts again on resume
+            PAUSED_TIMERS[session_id] += EXTENSION_DURATION_SECONDS
+            new_end_time = time.time() + PAUSED_TIMERS[session_id]
+            if logger:
+                logger.info(f"Timer extended for paused session {session_id}. Remaining on resume: {PAUSED_TIMERS[session_id]:.0f}s.")
+            return new_end_time
         if session_id in SCENARIO_TIMERS:
             # If timer somehow expired before extension, base extension on current time
             if SCENARIO_TIMERS[session_id] < time.time():
@@ -75,6 +83,7 @@ def remove_timer(session_id, app_logger=None):
     """
     logger = app_logger if app_logger else (current_app.logger if current_app else None)
     with TIMERS_LOCK:
+        PAUSED_TIMERS.pop(session_id, None)
         if session_id in SCENARIO_TIMERS:
             del SCENARIO_TIMERS[session_id]
             if logger:
@@ -84,6 +93,41 @@ def remove_timer(session_id, app_logger=None):
             return True
         return False
 
+def pause_timer(session_id, app_logger=None):
+    """
+    Pauses the timer of a suspended session, keeping its remaining time. Returns the remaining seconds or None.
+    Uses provided app_logger or falls back to current_app.logger.
+    """
+    logger = app_logger if app_logger else (current_app.logger if current_app else None)
+    with TIMERS_LOCK:
+        end_time = SCENARIO_TIMERS.pop(session_id, None)
+        if end_time is None:
+            return None
+        remaining = max(end_time - time.time(), 0.0)
+        PAUSED_TIMERS[session_id] = remaining
+        if logger:
+            logger.info(f"Timer paused for session {session_id} with {remaining:.0f}s remaining.")
+        return remaining
+
+def resume_timer(session_id, app_logger=None):
+    """
+    Resumes a paused timer from its remaining time. Returns the new end time (Unix timestamp) or None.
+    Uses provided app_logger or falls back to current_app.logger.
+    """
+    logger = app_logger if app_logger else (current_app.logger if current_app else None)
+    with TIMERS_LOCK:
+        remaining = PAUSED_TIMERS.pop(session_id, None)
+        if remaining is None:
+            return SCENARIO_TIMERS.get(session_id)
+        end_time = time.time() + remaining
+        SCENARIO_TIMERS[session_id] = end_time
+        if logger:
+            logger.info(
+                f"Timer resumed for session {session_id}. "
+                f"Ends at {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(end_time))}."
+            )
+        return end_time
+
 def get_timer_end_time(session_id):
     """Gets the end time for a session's timer. Returns float Unix timestamp or None."""
     with TIMERS_LOCK:
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Local SSH host for benchmarks/terminal_bench.py when no sshd is at hand.
+
+Accepts one generated key for any username and runs `bash --noprofile --norc` per channel, then writes a
+seed file registering N sessions that point at it:
+
+    python3 benchmarks/ssh_host.py --port 2222 --sessions 20 --seed-file /tmp/seed.json
+    SEED_SESSIONS_FILE=/tmp/seed.json python main.py     # or: python main_aio.py
+
+The shell runs without a PTY (no prompt, no echo of the input), which is all the benchmark's printf markers need.
+"""
+import sys
+import json
+import asyncio
+import argparse
+import asyncssh
+
+
+class BenchServer(asyncssh.SSHServer):
+    def __init__(self, authorized_key):
+        self.authorized_key = authorized_key
+
+    def begin_auth(self, username):
+        return True
+
+    def public_key_auth_supported(self):
+        return True
+
+    def validate_public_key(self, username, key):
+        return key == self.authorized_key
+
+
+async def run_shell(process):
+    shell = await asyncio.create_subprocess_exec(
+        'bash', '--noprofile', '--norc',
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT
+    )
+    await process.redirect(stdin=shell.stdin, stdout=shell.stdout)
+    process.exit(await shell.wait())
+
+
+async def main(args):
+    client_key = asyncssh.generate_private_key('ssh-ed25519')
+    host_key = asyncssh.generate_private_key('ssh-ed25519')
+    authorized_key = client_key.convert_to_public()
+    await asyncssh.create_server(
+        lambda: BenchServer(authorized_key), args.host, args.port,
+        server_host_keys=[host_key], process_factory=run_shell, encoding=None, line_editor=False
+    )
+
+    private_key_pem = client_key.export_private_key().decode()
+    seed_sessions = {
+        f"bench-{i}": {
+            "instance_ip": args.host, "ssh_port": args.port, "ssh_username": "bench",
+            "private_key_pem_content": private_key_pem
+        }
+        for i in range(1, args.sessions + 1)
+    }
+    with open(args.seed_file, 'w') as f:
+        json.dump(seed_sessions, f)
+    print(f"SSH host listening on {args.host}:{args.port}; {args.sessions} sessions written to {args.seed_file}", flush=True)
+    await asyncio.Future()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2222)
+    parser.add_argument('--sessions', type=int, default=10)
+    parser.add_argument('--seed-file', required=True)
+    sys.exit(asyncio.run(main(parser.parse_args())))
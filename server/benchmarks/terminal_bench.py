@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Terminal load benchmark for comparing the eventlet (main.py) and asyncio (main_aio.py) server modes.
+
+Each session gets one participant socket that repeatedly sends `printf 'M%s\\n' <token>` through
+terminalInput and times how long it takes for `M<token>` to come back as pty-output (echo latency).
+Optional spectator sockets per session add fan-out load; they need the server's INSTRUCTOR_TOKEN
+(--instructor-token). With --server-pid the server's CPU time is sampled from /proc to report sessions per core.
+
+Sessions must already exist; the simplest way is a seed file pointing at a local sshd
+(benchmarks/ssh_host.py runs one and writes the file):
+
+    {"bench-1": {"instance_ip": "127.0.0.1", "ssh_port": 22, "ssh_username": "bench", "private_key_path": "~/.ssh/bench_key"}, ...}
+
+    SEED_SESSIONS_FILE=seed.json INSTRUCTOR_TOKEN=bench python main.py       # or: python main_aio.py
+    python benchmarks/terminal_bench.py --url http://localhost:5000 --sessions bench-1 bench-2 \
+        --spectators 2 --instructor-token bench --server-pid <pid>
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+import socketio
+
+NAMESPACE = '/terminal_ws'
+
+def read_cpu_seconds(pid):
+    # utime + stime of the process, in seconds (Linux only)
+    with open(f"/proc/{pid}/stat", 'r') as f:
+        fields = f.read().rsplit(')', 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+async def run_participant(url, session_id, duration, interval, timeout, latencies, errors):
+    client = socketio.AsyncClient(reconnection=False)
+    pending = {}
+    recent_output = ['']
+
+    @client.on('pty-output', namespace=NAMESPACE)
+    async def on_output(data):
+        # Keep a short rolling buffer: a marker can be split across two output chunks
+        recent_output[0] = (recent_output[0] + data.get('output', ''))[-512:]
+        for token, (sent_at, future) in list(pending.items()):
+            if f"M{token}" in recent_output[0] and not future.done():
+                future.set_result(time.perf_counter() - sent_at)
+                del pending[token]
+
+    await client.connect(url, namespaces=[NAMESPACE], transports=['websocket'])
+    await client.emit('join_scenario', {'sessionId': session_id}, namespace=NAMESPACE)
+
+    async def round_trip(wait_seconds=timeout):
+        token = uuid.uuid4().hex[:12]
+        future = asyncio.get_running_loop().create_future()
+        pending[token] = (time.perf_counter(), future)
+        await client.emit('terminalInput', {'sessionId': session_id, 'input': f"printf 'M%s\\n' {token}\n"}, namespace=NAMESPACE)
+        try:
+            return await asyncio.wait_for(future, wait_seconds)
+        finally:
+            pending.pop(token, None)
+
+    async def warm_up():
+        # Input sent before the server has connected SSH is dropped, so retry until the shell answers
+        while True:
+            try:
+                return await round_trip(wait_seconds=1)
+            except asyncio.TimeoutError:
+                pass
+
+    try:
+        await asyncio.wait_for(warm_up(), timeout)
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            try:
+                latencies.append(await round_trip())
+            except asyncio.TimeoutError:
+                errors.append(session_id)
+            await asyncio.sleep(interval)
+    finally:
+        await client.disconnect()
+
+async def run_spectator(url, session_id, instructor_token, duration, frame_counter, joined_counter):
+    client = socketio.AsyncClient(reconnection=False)
+
+    @client.on('pty-output', namespace=NAMESPACE)
+    async def on_output(data):
+        frame_counter[0] += 1
+        if data.get('output', '').startswith('\r\nSpectating '):
+            joined_counter[0] += 1  # The server accepted the join (a rejected one gets an error and is disconnected)
+
+    await client.connect(url, namespaces=[NAMESPACE], transports=['websocket'])
+    await client.emit(
+        'join_scenario', {'sessionId': session_id, 'role': 'spectator', 'instructorToken': instructor_token}, namespace=NAMESPACE
+    )
+    await asyncio.sleep(duration)
+    await client.disconnect()
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def main(args):
+    latencies, errors, spectator_frames, spectators_joined = [], [], [0], [0]
+    cpu_before = read_cpu_seconds(args.server_pid) if args.server_pid else None
+    started = time.perf_counter()
+
+    tasks = [run_participant(args.url, s_id, args.duration, args.interval, args.timeout, latencies, errors) for s_id in args.sessions]
+    tasks += [
+        run_spectator(args.url, s_id, args.instructor_token, args.duration, spectator_frames, spectators_joined)
+        for s_id in args.sessions for _ in range(args.spectators)
+    ]
+    await asyncio.gather(*tasks)
+
+    wall_seconds = time.perf_counter() - started
+    summary = {
+        'label': args.label,
+        'sessions': len(args.sessions),
+        'spectators_per_session': args.spectators,
+        'spectators_joined': spectators_joined[0],
+        'round_trips': len(latencies),
+        'timeouts': len(errors),
+        'spectator_frames': spectator_frames[0],
+        'wall_seconds': round(wall_seconds, 2),
+    }
+    if latencies:
+        summary.update({
+            'echo_latency_ms_p50': round(statistics.median(latencies) * 1000, 2),
+            'echo_latency_ms_p95': round(percentile(latencies, 95) * 1000, 2),
+            'echo_latency_ms_max': round(max(latencies) * 1000, 2),
+        })
+    if cpu_before is not None:
+        cpu_seconds = read_cpu_seconds(args.server_pid) - cpu_before
+        core_utilization = cpu_seconds / wall_seconds
+        summary['server_cpu_seconds'] = round(cpu_seconds, 2)
+        summary['server_core_utilization'] = round(core_utilization, 3)
+        summary['sessions_per_core'] = round(len(args.sessions) / core_utilization, 1) if core_utilization else None
+    print(json.dumps(summary, indent=2))
+    if spectators_joined[0] < len(args.sessions) * args.spectators:
+        print("Some spectators were rejected: check --instructor-token against the server's INSTRUCTOR_TOKEN", file=sys.stderr)
+        return 1
+    return 1 if errors and not latencies else 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--sessions', nargs='+', required=True, help='Existing (e.g. seeded) session IDs')
+    parser.add_argument('--spectators', type=int, default=0, help='Spectator sockets per session')
+    parser.add_argument('--instructor-token', default=os.environ.get('INSTRUCTOR_TOKEN'),
+                        help="The server's INSTRUCTOR_TOKEN, required for --spectators (default: $INSTRUCTOR_TOKEN)")
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds of load per participant')
+    parser.add_argument('--interval', type=float, default=0.2, help='Pause between round trips per participant')
+    parser.add_argument('--timeout', type=float, default=10.0, help='Seconds before a round trip counts as lost')
+    parser.add_argument('--server-pid', type=int, help='Server process to sample CPU time from (/proc)')
+    parser.add_argument('--label', default='', help='Free-form label for the summary, e.g. eventlet or asyncio')
+    args = parser.parse_args()
+    if args.spectators and not args.instructor_token:
+        parser.error('--spectators needs --instructor-token (the server rejects spectators without it)')
+    sys.exit(asyncio.run(main(args)))
@@ -8,4 +8,29 @@ class Config(object):
   DEBUG = os.environ.get('PYTHON_ENV') == 'development'
   SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
     'sqlite:///' + os.path.join(basedir, 'app.db')
-  SQLALCHEMY_TRACK_MODIFICATIONS = os.environ.get('PYTHON_ENV') == 'development'
\ No newline at end of file
+  SQLALCHEMY_TRACK_MODIFICATIONS = os.environ.get('PYTHON_ENV') == 'development'
+  # Comma separated 'region' or 'region:profile' entries scenarios may be placed in, e.g. 'us-east-1,us-west-2:training'
+  SCENARIO_PLACEMENTS = os.environ.get('SCENARIO_PLACEMENTS') or 'us-east-1'
+  # Comma separated 'placement=max_sessions' entries, e.g. 'us-east-1=20,us-west-2:training=10'. Unlisted placements are unlimited.
+  SCENARIO_PLACEMENT_QUOTAS = os.environ.get('SCENARIO_PLACEMENT_QUOTAS', '')
+  # Stop a scenario's instances after this many seconds without PTY input/output (0 disables). Resumed on next join.
+  IDLE_SUSPEND_SECONDS = int(os.environ.get('IDLE_SUSPEND_SECONDS', 20 * 60))
+  # Optional EC2 endpoint override for idle suspend/resume, e.g. a local moto_server stand-in
+  EC2_ENDPOINT_URL = os.environ.get('EC2_ENDPOINT_URL')
+  # Optional JSON file of pre-existing SSH hosts to register as sessions (benchmarks / local development)
+  SEED_SESSIONS_FILE = os.environ.get('SEED_SESSIONS_FILE')
+  # Shared secret for spectating (join_scenario role "spectator", watch_sessions); unset disables spectating
+  INSTRUCTOR_TOKEN = os.environ.get('INSTRUCTOR_TOKEN', '')
+  LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+  # Per-session rotating log files (terraform / SSH detail), served to instructors by GET /api/scenarios/<id>/logs
+  SESSION_LOG_DIR = os.environ.get('SESSION_LOG_DIR') or os.path.join(basedir, 'logs', 'sessions')
+  SESSION_LOG_MAX_BYTES = int(os.environ.get('SESSION_LOG_MAX_BYTES', 5 * 1024 * 1024))
+  SESSION_LOG_BACKUP_COUNT = int(os.environ.get('SESSION_LOG_BACKUP_COUNT', 2))
+  # Session log files not written to for this many days are deleted (0 keeps them forever)
+  SESSION_LOG_RETENTION_DAYS = float(os.environ.get('SESSION_LOG_RETENTION_DAYS', 14))
+  # Max records per second per log call site and session (0 disables), for hot-path lines marked
+  # extra=RATE_LIMITED and INFO/DEBUG records of the noisy library loggers below
+  LOG_RATE_LIMIT_PER_SECOND = float(os.environ.get('LOG_RATE_LIMIT_PER_SECOND', 10))
+  LOG_RATE_LIMITED_LOGGERS = os.environ.get('LOG_RATE_LIMITED_LOGGERS', 'engineio,socketio,aiohttp.access')
+  # Fraction of HTTP requests logged at DEBUG (method, path, status, duration)
+  LOG_REQUEST_SAMPLE_RATE = float(os.environ.get('LOG_REQUEST_SAMPLE_RATE', 0.01))
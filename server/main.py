@@ -1,25 +1,24 @@
-import logging
-from flask import Flask, request
+import time
+import random
+from flask import Flask, request, g
 # from flask_cors import CORS # No longer needed here if done in create_app
 from app import create_app, socketio
+from app.logging_setup import configure_logging
+from config import Config
 import eventlet
 
 eventlet.monkey_patch()
 
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger('werkzeug')
-logger.setLevel(logging.DEBUG)
-app_logger = logging.getLogger('flask.app')
-app_logger.setLevel(logging.DEBUG)
+# Queue-based JSON logging; must be configured before create_app() so Flask's logger uses it
+configure_logging(Config)
 
 app = create_app()
 
 @app.before_request
 def log_request_info():
-    app.logger.debug(f"Incoming HTTP request: {request.method} {request.url}")
-    app.logger.debug(f"Request headers: {request.headers}")
-    if request.data:
-        app.logger.debug(f"Request body: {request.get_data(as_text=True)}")
+    # Sample instead of logging every request; headers and bodies are never logged
+    g.log_request = random.random() < app.config['LOG_REQUEST_SAMPLE_RATE']
+    g.request_started = time.perf_counter()
 
 @app.after_request
 def log_response_info(response):
@@ -31,8 +30,9 @@ def log_response_info(response):
         response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
         response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
         response.headers.add('Access-Control-Allow-Credentials', 'true')
-    app.logger.debug(f"Response status: {response.status}")
-    app.logger.debug(f"Response headers: {response.headers}")
+    if g.get('log_request'):
+        duration_ms = (time.perf_counter() - g.request_started) * 1000
+        app.logger.debug(f"HTTP {request.method} {request.path} -> {response.status_code} in {duration_ms:.1f}ms")
     return response
 
 if __name__ == '__main__':
@@ -0,0 +1,15 @@
+# asyncio server mode entry point: same API and /terminal_ws events as main.py, without eventlet.
+import os
+import logging
+from aiohttp import web
+from app.aio import create_aio_app
+from app.logging_setup import configure_logging
+from config import Config
+
+configure_logging(Config)
+
+app = create_aio_app()
+
+if __name__ == '__main__':
+    logging.getLogger('app.aio').info("Starting aiohttp Socket.IO server...")
+    web.run_app(app, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
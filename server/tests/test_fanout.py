@@ -0,0 +1,61 @@
+import pytest
+from app import fanout, lifecycle
+from app.fanout import ROLE_PARTICIPANT, ROLE_SPECTATOR, subscribe, get_role, broadcast_pty_output
+from app.lifecycle import SCENARIO_SESSIONS, check_join, watch_sessions, unwatch_sessions
+
+TOKEN = "instructor-secret"
+
+
+@pytest.fixture(autouse=True)
+def sessions():
+    SCENARIO_SESSIONS.update({"clw-demo-aaaaa": {"repo": "demo"}, "clw-demo-bbbbb": {"repo": "demo"}})
+    yield
+    SCENARIO_SESSIONS.clear()
+    fanout.SUBSCRIBERS.clear()
+
+
+def test_spectating_requires_instructor_token():
+    assert check_join("clw-demo-aaaaa", ROLE_SPECTATOR)[0]
+    assert check_join("clw-demo-aaaaa", ROLE_SPECTATOR, "wrong", TOKEN)[0]
+    assert check_join("clw-demo-aaaaa", ROLE_SPECTATOR, TOKEN, TOKEN) == (None, False)
+    # Unconfigured token disables spectating, even for an empty token
+    assert check_join("clw-demo-aaaaa", ROLE_SPECTATOR, "", "")[0]
+    # Without the token an unknown ID gets the same answer as a known one
+    assert check_join("clw-demo-zzzzz", ROLE_SPECTATOR, "wrong", TOKEN) == check_join("clw-demo-aaaaa", ROLE_SPECTATOR, "wrong", TOKEN)
+
+
+def test_watch_sessions_does_not_reveal_which_ids_exist():
+    reply, joined = watch_sessions("sid-1", ["clw-demo-aaaaa", "clw-demo-zzzzz"], TOKEN, TOKEN)
+    assert reply == {"status": "ok", "requested": 2}
+    assert joined == ["clw-demo-aaaaa"]
+    assert get_role("clw-demo-aaaaa", "sid-1") == ROLE_SPECTATOR
+
+    reply, joined = watch_sessions("sid-2", ["clw-demo-aaaaa"], "wrong", TOKEN)
+    assert reply["status"] == "error" and joined == []
+
+
+def test_watch_sessions_is_capped_per_connection(monkeypatch):
+    monkeypatch.setattr(lifecycle, "MAX_WATCHED_SESSIONS", 2)
+    assert watch_sessions("sid-1", ["clw-demo-aaaaa", "clw-demo-bbbbb", "clw-demo-ccccc"], TOKEN, TOKEN)[0]["status"] == "error"
+    assert watch_sessions("sid-1", ["clw-demo-aaaaa"], TOKEN, TOKEN)[0]["status"] == "ok"
+    assert watch_sessions("sid-1", ["clw-demo-bbbbb", "clw-demo-ccccc"], TOKEN, TOKEN)[0]["status"] == "error"
+
+
+def test_unwatch_all_keeps_participant_subscriptions():
+    subscribe("clw-demo-aaaaa", "sid-1", ROLE_PARTICIPANT)
+    watch_sessions("sid-1", ["clw-demo-bbbbb"], TOKEN, TOKEN)
+    assert unwatch_sessions("sid-1", None) == {"status": "ok", "unwatched": ["clw-demo-bbbbb"]}
+    assert get_role("clw-demo-aaaaa", "sid-1") == ROLE_PARTICIPANT
+
+
+def test_broadcast_emits_once_to_the_session_room():
+    class FakeSocketIO(object):
+        def __init__(self):
+            self.emits = []
+
+        def emit(self, event, data, to=None, namespace=None):
+            self.emits.append((event, data, to, namespace))
+
+    socketio = FakeSocketIO()
+    broadcast_pty_output(socketio, "clw-demo-aaaaa", "ls\r\n")
+    assert socketio.emits == [("pty-output", {"output": "ls\r\n", "sessionId": "clw-demo-aaaaa"}, "clw-demo-aaaaa", "/terminal_ws")]
@@ -0,0 +1,118 @@
+import logging
+from collections import namedtuple
+import pytest
+from botocore.exceptions import ClientError
+from app import idle_manager, timer_manager
+from app.lifecycle import SCENARIO_SESSIONS, ServerIO, suspend_session, resume_session, input_while_suspended_action
+
+moto = pytest.importorskip('moto')
+
+logger = logging.getLogger('tests.idle_suspend')
+
+
+@pytest.fixture
+def ec2(monkeypatch):
+    for name in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'AWS_SECURITY_TOKEN', 'AWS_SESSION_TOKEN'):
+        monkeypatch.setenv(name, 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with moto.mock_aws():
+        ec2_client = idle_manager.ec2_client_for({"region": "us-east-1"})
+        image_id = ec2_client.describe_images()['Images'][0]['ImageId']
+        reservation = ec2_client.run_instances(ImageId=image_id, MinCount=2, MaxCount=2, InstanceType='t3.micro')
+        yield ec2_client, [instance['InstanceId'] for instance in reservation['Instances']]
+    SCENARIO_SESSIONS.clear()
+    timer_manager.SCENARIO_TIMERS.clear()
+    timer_manager.PAUSED_TIMERS.clear()
+
+
+Emitted = namedtuple('Emitted', ['event', 'data', 'to'])
+
+
+def recording_io(sent):
+    # Records what would be sent to the clients instead of emitting it
+    return ServerIO(
+        emit=lambda event, data, to: sent.append(Emitted(event, data, to)),
+        broadcast=lambda session_id, output: sent.append(Emitted('pty-output', {'output': output}, session_id)),
+        close_room=lambda room: None,
+        spawn=lambda func, *args: func(*args),
+    )
+
+
+def instance_states(ec2_client, instance_ids):
+    reservations = ec2_client.describe_instances(InstanceIds=instance_ids)['Reservations']
+    return {instance['State']['Name'] for reservation in reservations for instance in reservation['Instances']}
+
+
+def test_suspend_and_resume_stop_and_start_the_instances(ec2):
+    ec2_client, instance_ids = ec2
+    # Instance IDs normally come from `terraform show`; seed them so suspend skips that lookup
+    SCENARIO_SESSIONS["clw-demo-aaaaa"] = {
+        "repo": "demo", "status": "provisioned", "placement": {"region": "us-east-1"},
+        "instance_ids": instance_ids, "ssh_instance_id": instance_ids[0], "instance_ip": "10.0.0.5",
+    }
+    timer_manager.init_timer("clw-demo-aaaaa", app_logger=logger)
+    closed, sent = [], []
+
+    assert suspend_session("clw-demo-aaaaa", None, lambda s_id, log: closed.append(s_id), recording_io(sent), logger)
+    assert closed == ["clw-demo-aaaaa"]
+    assert instance_states(ec2_client, instance_ids) <= {"stopping", "stopped"}
+    assert SCENARIO_SESSIONS["clw-demo-aaaaa"]["status"] == "suspended"
+    assert input_while_suspended_action("clw-demo-aaaaa") == "resume"
+    paused = [emitted for emitted in sent if emitted.event == 'timer-paused']
+    assert paused and paused[0].data['remainingSeconds'] > 0 and paused[0].to == "clw-demo-aaaaa"
+
+    sent.clear()
+    assert resume_session("clw-demo-aaaaa", "sid-1", None, recording_io(sent), logger, ssh_ready=lambda host: True)
+    assert instance_states(ec2_client, instance_ids) == {"running"}
+    scenario = SCENARIO_SESSIONS["clw-demo-aaaaa"]
+    assert scenario["status"] == "provisioned" and input_while_suspended_action("clw-demo-aaaaa") is None
+    assert scenario["instance_ip"] != "10.0.0.5"  # Picked up the restarted instance's public IP
+    assert sent[-1].event == 'timer-update'
+
+
+def test_failed_stop_leaves_the_session_running(ec2, monkeypatch):
+    _, instance_ids = ec2
+    SCENARIO_SESSIONS["clw-demo-aaaaa"] = {
+        "repo": "demo", "status": "provisioned", "placement": {"region": "us-east-1"},
+        "instance_ids": instance_ids, "ssh_instance_id": instance_ids[0], "instance_ip": "10.0.0.5",
+    }
+    def stop_denied(ec2_client, instance_ids, log):
+        raise RuntimeError("UnauthorizedOperation")
+    monkeypatch.setattr('app.lifecycle.stop_instances', stop_denied)
+    closed, sent = [], []
+
+    assert not suspend_session("clw-demo-aaaaa", None, lambda s_id, log: closed.append(s_id), recording_io(sent), logger)
+    assert SCENARIO_SESSIONS["clw-demo-aaaaa"]["status"] == "provisioned"
+    assert not closed and not sent  # SSH and the timer were left alone
+
+
+def test_resume_waits_for_instances_that_are_still_stopping(ec2, monkeypatch):
+    ec2_client, instance_ids = ec2
+    SCENARIO_SESSIONS["clw-demo-aaaaa"] = {
+        "repo": "demo", "status": "provisioned", "placement": {"region": "us-east-1"},
+        "instance_ids": instance_ids, "ssh_instance_id": instance_ids[0], "instance_ip": "10.0.0.5",
+    }
+    assert suspend_session("clw-demo-aaaaa", None, lambda s_id, log: None, recording_io([]), logger)
+
+    # moto stops instances at once; make them look 'stopping' for a few polls, and reject starts meanwhile like EC2 does
+    stopping_polls = [2]
+
+    def report_stopping(parsed, **kwargs):
+        if stopping_polls[0]:
+            stopping_polls[0] -= 1
+            for reservation in parsed['Reservations']:
+                for instance in reservation['Instances']:
+                    instance['State'] = {'Code': 64, 'Name': 'stopping'}
+
+    def reject_start_while_stopping(**kwargs):
+        if stopping_polls[0]:
+            raise ClientError({'Error': {'Code': 'IncorrectInstanceState', 'Message': 'stopping'}}, 'StartInstances')
+
+    ec2_client.meta.events.register('after-call.ec2.DescribeInstances', report_stopping)
+    ec2_client.meta.events.register('before-call.ec2.StartInstances', reject_start_while_stopping)
+    monkeypatch.setattr('app.lifecycle.ec2_client_for', lambda placement, endpoint_url=None: ec2_client)
+    monkeypatch.setattr(idle_manager, 'INSTANCE_WAITER_CONFIG', {'Delay': 0, 'MaxAttempts': 5})
+
+    assert resume_session("clw-demo-aaaaa", "sid-1", None, recording_io([]), logger, ssh_ready=lambda host: True)
+    assert stopping_polls == [0]
+    assert instance_states(ec2_client, instance_ids) == {"running"}
@@ -0,0 +1,86 @@
+import os
+import json
+import time
+import logging
+import logging.handlers
+import queue
+from app.logging_setup import (
+    RATE_LIMITED, JsonFormatter, RateLimitFilter, SessionFileHandler, session_logger, close_session_log,
+    SESSION_DETAIL_LOGGER_NAME
+)
+
+
+def make_record(msg, level=logging.INFO, name='app', lineno=10, **extra):
+    record = logging.LogRecord(name, level, __file__, lineno, msg, None, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_rate_limit_is_per_session_and_only_for_marked_records():
+    rate_limit = RateLimitFilter(per_second=1, limited_loggers=['engineio'])
+    # Unmarked application records are never dropped
+    assert all(rate_limit.filter(make_record("plain")) for _ in range(50))
+    # The same hot-path call site gets its own budget per session
+    assert all(rate_limit.filter(make_record("input", session_id=f"s{i}", **RATE_LIMITED)) for i in range(40))
+    assert not rate_limit.filter(make_record("input", session_id="s0", **RATE_LIMITED))
+    # Noisy library loggers are limited below WARNING only
+    assert rate_limit.filter(make_record("packet", name='engineio.server'))
+    assert not rate_limit.filter(make_record("packet", name='engineio.server'))
+    assert rate_limit.filter(make_record("packet", name='engineio.server', level=logging.WARNING))
+
+
+def test_session_files_are_written_and_closed_through_the_queue(tmp_path):
+    session_handler = SessionFileHandler(str(tmp_path), max_bytes=0, backup_count=0)
+    session_handler.setFormatter(JsonFormatter())
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, session_handler)
+    logger = logging.getLogger('tests.logging_setup')
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    detail_logger = logging.getLogger(SESSION_DETAIL_LOGGER_NAME)
+    detail_logger.setLevel(logging.DEBUG)  # As configure_logging() does
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    logger.addHandler(queue_handler)
+    detail_logger.addHandler(queue_handler)
+    listener.start()
+    try:
+        for i in range(40):
+            session_logger(logger, f"clw-demo-{i}", 'ssh').info("joined")
+            close_session_log(f"clw-demo-{i}")
+    finally:
+        listener.stop()
+        logger.removeHandler(queue_handler)
+        detail_logger.removeHandler(queue_handler)
+
+    assert len(os.listdir(tmp_path)) == 40
+    with open(tmp_path / 'clw-demo-7.log') as f:
+        entries = [json.loads(line) for line in f]
+    assert [entry["msg"] for entry in entries] == ["joined", "Session log closed"]
+    assert entries[0]["session_id"] == "clw-demo-7" and entries[0]["phase"] == "ssh"
+    assert not session_handler._handlers  # Every file handle was closed by the listener
+
+
+def test_closing_a_session_log_drops_its_rate_limit_buckets():
+    rate_limit = RateLimitFilter(per_second=1)
+    for session_id in ("s1", "s2"):
+        rate_limit.filter(make_record("input", session_id=session_id, **RATE_LIMITED))
+    assert rate_limit.filter(make_record("Session log closed", session_id="s1", close_session_log=True))
+    assert [call_site[3] for call_site in rate_limit._buckets] == ["s2"]
+
+
+def test_expired_session_logs_are_pruned(tmp_path):
+    expired = time.time() - 3 * 24 * 60 * 60
+    for file_name in ("old.log", "old.log.1", "recent.log"):
+        (tmp_path / file_name).write_text("{}\n")
+    for file_name in ("old.log", "old.log.1"):
+        os.utime(tmp_path / file_name, (expired, expired))
+
+    session_handler = SessionFileHandler(str(tmp_path), max_bytes=0, backup_count=0, retention_seconds=24 * 60 * 60)
+    assert os.listdir(tmp_path) == ["recent.log"]  # Pruned at startup
+
+    (tmp_path / "open.log").write_text("{}\n")
+    os.utime(tmp_path / "open.log", (expired, expired))
+    session_handler._handler_for("open")  # A session that is still logging keeps its file however old
+    session_handler.prune_expired()
+    assert sorted(os.listdir(tmp_path)) == ["open.log", "recent.log"]
+    session_handler.close()
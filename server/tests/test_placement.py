@@ -0,0 +1,89 @@
+import time
+import pytest
+from app import placement
+from app.placement import (
+    ConfiguredQuotaSource, choose_placement, parse_placements, reserve_placement, release_placement,
+    record_provisioning_outcome, placement_key
+)
+
+
+class FakeQuotaSource(object):
+    def __init__(self, quotas):
+        self.quotas = quotas
+        self.asked = []
+
+    def get_quota(self, placement):
+        self.asked.append(placement_key(placement))
+        return self.quotas.get(placement_key(placement))
+
+
+@pytest.fixture(autouse=True)
+def clean_placement_state():
+    placement.PLACEMENTS.clear()
+    placement.PLACEMENT_OUTCOMES.clear()
+    yield
+    placement.PLACEMENTS.clear()
+    placement.PLACEMENT_OUTCOMES.clear()
+
+
+def test_parse_placements_defaults_and_profiles():
+    assert parse_placements("") == [{"region": "us-east-1", "profile": None}]
+    assert parse_placements("us-east-1, us-west-2:training") == [
+        {"region": "us-east-1", "profile": None},
+        {"region": "us-west-2", "profile": "training"},
+    ]
+
+
+def test_unlimited_placements_spread_by_session_count():
+    # Default config: no quotas at all. Sessions must still alternate instead of piling into the first region.
+    candidates = parse_placements("us-east-1,us-west-2")
+    quota_source = ConfiguredQuotaSource({})
+    chosen = [placement_key(reserve_placement(f"s{i}", candidates, quota_source)) for i in range(4)]
+    assert chosen == ["us-east-1", "us-west-2", "us-east-1", "us-west-2"]
+
+
+def test_choose_placement_prefers_lower_utilization():
+    candidates = parse_placements("us-east-1,us-west-2")
+    quota_source = FakeQuotaSource({"us-east-1": 10, "us-west-2": 4})
+    chosen = choose_placement(candidates, {"us-east-1": 3, "us-west-2": 2}, quota_source, {})
+    assert placement_key(chosen) == "us-east-1"  # 3/10 beats 2/4
+    assert quota_source.asked == ["us-east-1", "us-west-2"]
+
+
+def test_choose_placement_skips_full_placements_and_returns_none_when_all_full():
+    candidates = parse_placements("us-east-1,us-west-2")
+    quota_source = FakeQuotaSource({"us-east-1": 1, "us-west-2": 1})
+    assert placement_key(choose_placement(candidates, {"us-east-1": 1}, quota_source, {})) == "us-west-2"
+    assert choose_placement(candidates, {"us-east-1": 1, "us-west-2": 1}, quota_source, {}) is None
+
+
+def test_choose_placement_avoids_recent_failures():
+    candidates = parse_placements("us-east-1,us-west-2")
+    quota_source = FakeQuotaSource({"us-east-1": 10, "us-west-2": 10})
+    chosen = choose_placement(candidates, {"us-west-2": 5}, quota_source, {"us-east-1": 0.5})
+    assert placement_key(chosen) == "us-west-2"  # 0.5 + 2.0 * 0.5 loses to 5/10
+
+
+def test_reserve_placement_counts_against_quota_until_released():
+    candidates = parse_placements("us-east-1")
+    quota_source = FakeQuotaSource({"us-east-1": 2})
+    assert reserve_placement("a", candidates, quota_source)
+    assert reserve_placement("b", candidates, quota_source)
+    assert reserve_placement("c", candidates, quota_source) is None
+    assert placement_key(release_placement("a")) == "us-east-1"
+    assert reserve_placement("c", candidates, quota_source)
+
+
+def test_reserve_placement_uses_recorded_failure_rate():
+    candidates = parse_placements("us-east-1,us-west-2")
+    quota_source = FakeQuotaSource({})
+    record_provisioning_outcome({"region": "us-east-1", "profile": None}, succeeded=False)
+    assert placement_key(reserve_placement("a", candidates, quota_source)) == "us-west-2"
+
+
+def test_old_failures_expire(monkeypatch):
+    candidates = parse_placements("us-east-1,us-west-2")
+    record_provisioning_outcome({"region": "us-east-1", "profile": None}, succeeded=False)
+    real_time = time.time()
+    monkeypatch.setattr(placement.time, "time", lambda: real_time + placement.FAILURE_WINDOW_SECONDS + 1)
+    assert placement_key(reserve_placement("a", candidates, FakeQuotaSource({}))) == "us-east-1"